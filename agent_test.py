@@ -1,13 +1,16 @@
 import pickle
 import neat
-import pygame
 import numpy as np
-import matplotlib.pyplot as plt
 import os
-import csv
 import re
-from datetime import datetime
+import sys
+import argparse
 from env import SoccerEnv  # Your custom env
+from trajectory import TrajectoryWriter
+from render import get_font
+from heatmap import HeatmapAccumulator, heatmap_path, heatmap_title
+from compiled_net import NetCache
+from checkpoint import run_setting, CHECKPOINT_PATH
 
 WIDTH, HEIGHT = 640, 480
 PLAYER_SIZE = 20
@@ -15,15 +18,20 @@ BALL_SIZE = 10
 PLAYER_SPEED = 5
 BALL_SPEED = 6
 GOAL_WIDTH = 80
+DECISION_INTERVAL = 1  # physics steps each decision is repeated for (main uses the run's)
+
+CONFIG_PATH = "config-feedforward.txt"
+net_cache = NetCache()  # the winner is usually also the last best_gen checkpoint
 
 # Load the NEAT config
-config = neat.Config(
-    neat.DefaultGenome,
-    neat.DefaultReproduction, 
-    neat.DefaultSpeciesSet,
-    neat.DefaultStagnation,
-    "config-feedforward.txt"
-)
+def load_config(path=CONFIG_PATH):
+    return neat.Config(
+        neat.DefaultGenome,
+        neat.DefaultReproduction,
+        neat.DefaultSpeciesSet,
+        neat.DefaultStagnation,
+        path
+    )
 
 # Random policy for player 2
 def random_opponent_action():
@@ -83,43 +91,40 @@ def rule_based_agent2(env):
 
 # Render overlay text (generation, episode)
 def draw_text(screen, text, x, y, size=24, color=(255, 255, 255)):
-    font = pygame.font.SysFont("Arial", size)
+    font = get_font(size)
     surface = font.render(text, True, color)
     screen.blit(surface, (x, y))
 
 
-def plot_heatmap(positions, gen_num):
-    xs = [p[0] for p in positions]
-    ys = [p[1] for p in positions]
-
-    heatmap, xedges, yedges = np.histogram2d(xs, ys, bins=(32, 24), range=[[0, WIDTH], [0, HEIGHT]])
-
-    plt.clf()
-    plt.imshow(heatmap.T, origin='lower', cmap='magma', interpolation='nearest', extent=[0, WIDTH, 0, HEIGHT])
-    plt.colorbar(label='Visit Frequency')
-    plt.title(f"Player 1 Heatmap - Generation {gen_num}")
-    plt.xlabel("X Position")
-    plt.ylabel("Y Position")
-
+# Same file heatmap.py draws for the checkpoint
+def plot_heatmap(heatmap, path):
+    filename = heatmap_path(path)
+    heatmap.save(filename, heatmap_title(path))
+    print(f"Heatmap saved: {filename}")
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    dirname = f"heatmaps"
 
-    os.makedirs(dirname, exist_ok=True)
-    filename = f"{dirname}/heatmap_gen{gen_num}.png"
-    plt.savefig(filename)
-    print(f"Heatmap saved: {filename}")
 
+# Visualize a genome for 5 episodes; path is the file it was loaded from
+def visualize_agent(net, generation_number, path):
+    heatmap = HeatmapAccumulator()  # Positions across all 5 episodes
+    # The winner's steps are streamed to disk as they are played
+    writer = TrajectoryWriter("obs_log_winner.npy") if generation_number == "winner" else None
+    try:
+        _play_episodes(net, generation_number, heatmap, writer)
+    finally:
+        if writer is not None:
+            writer.close()
+            print("Logged trajectory to obs_log_winner.npy")
+    plot_heatmap(heatmap, path)
 
 
-# Visualize a genome for 5 episodes
-def visualize_agent(net, generation_number):
-    p1_positions = []  # Track across all 5 episodes
-    obs_log = []
+def _play_episodes(net, generation_number, heatmap, writer):
+    import pygame
     for episode in range(1, 6):
         env = SoccerEnv(render_mode=True)
         obs = env.reset()
         done = False
+        step = 0
 
         while not done:
             for event in pygame.event.get():
@@ -132,47 +137,77 @@ def visualize_agent(net, generation_number):
             action2 = get_agent2_action(env)
             #action2 = random_opponent_action()
             print(action1,action2,env.possession)
-            obs, reward, done, scorer, _ = env.step(action1, action2)
-
-            p1_positions.append(env.p1.center)
-            if generation_number == "winner":
-                obs_log.append(obs)
+            prev_obs = obs
+            # The decision is played one physics step at a time (as step_repeat
+            # would) so the heatmap gets every step whatever the interval
+            reward = 0.0
+            for substep in range(DECISION_INTERVAL):
+                obs, step_reward, done, scorer, _ = env.step(action1, action2)
+                reward += step_reward
+                heatmap.add(env)
+                if done:
+                    break
+
+            if writer is not None:
+                writer.append(episode, step, prev_obs, action1, action2, reward, scorer)
+            step += substep + 1
             # Draw overlay info
             draw_text(env.screen, f"Gen {generation_number}, Episode {episode}", 10, 10)
 
             pygame.display.update()
 
         print(f"Gen {generation_number} - Episode {episode} ended. Final reward: {reward}")
-        plot_heatmap(p1_positions, generation_number)
-        if generation_number == "winner":
-                with open('obs_log_winner.csv', 'w', newline='') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(["p1_x", "p1_y", "p2_x", "p2_y", "ball_x", "ball_y", "ball_vel_0", "ball_vel_1", "possession"])
-                    writer.writerows(obs_log)
-                print("Logged observations to obs_log_winner.csv")
         pygame.time.wait(1000)  # Pause briefly between episodes
         pygame.display.quit()
 
-# Load all best_gen_genXX.pkl files and run them
-def run_all_best_genomes():
+# best_gen_genXX.pkl files in generation order, then winner.pkl
+def checkpoint_files():
     files = [f for f in os.listdir() if re.match(r"best_gen_gen\d+\.pkl", f)]
     files.sort(key=lambda f: int(re.findall(r'\d+', f)[0]))  # Sort by generation number
+    if os.path.exists("winner.pkl"):
+        files.append("winner.pkl")
+    return files
+
 
-    for file in files:
-        gen_num = int(re.findall(r'\d+', file)[0])
+# Load the given checkpoints (default: all of them) and run them
+def run_all_best_genomes(files=None, config=None):
+    config = config or load_config()
+    for file in files if files is not None else checkpoint_files():
         with open(file, "rb") as f:
             genome = pickle.load(f)
 
-        print(f"\n🔍 Running visualization for Generation {gen_num}")
-        net = neat.nn.FeedForwardNetwork.create(genome, config)
-        visualize_agent(net, gen_num)
-    
-    if os.path.exists("winner.pkl"):
-        with open("winner.pkl", "rb") as f:
-            winner_genome = pickle.load(f)
-
-        print(f"\n🏆 Running visualization for Final Winner")
-        net = neat.nn.FeedForwardNetwork.create(winner_genome, config)
-        visualize_agent(net, "winner")
-
-run_all_best_genomes()
+        match = re.search(r"best_gen_gen(\d+)\.pkl$", file)
+        if match:
+            gen_num = int(match.group(1))
+            print(f"\n🔍 Running visualization for Generation {gen_num}")
+        else:
+            gen_num = os.path.splitext(os.path.basename(file))[0]  # "winner" for winner.pkl
+            print(f"\n🏆 Running visualization for {'Final Winner' if gen_num == 'winner' else gen_num}")
+        net = net_cache.get(genome, config)
+        visualize_agent(net, gen_num, file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch saved genomes play against the scripted opponent")
+    parser.add_argument("genomes", nargs="*", help="genome .pkl files (default: every best_gen_gen*.pkl and winner.pkl)")
+    parser.add_argument("--config", default=CONFIG_PATH, help="NEAT config file")
+    parser.add_argument("--decision-interval", type=int,
+                        help="physics steps per decision (default: the one saved with the run in --checkpoint, else 1)")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH, help="training checkpoint the defaults come from")
+    args = parser.parse_args(argv)
+    if args.decision_interval is not None and args.decision_interval < 1:
+        parser.error("--decision-interval must be at least 1")
+
+    global DECISION_INTERVAL
+    DECISION_INTERVAL = args.decision_interval or run_setting("decision_interval", DECISION_INTERVAL, args.checkpoint)
+
+    files = args.genomes or checkpoint_files()
+    if not files:
+        print("No genomes to visualize")
+        return 1
+    run_all_best_genomes(files, load_config(args.config))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,285 @@
+# bench.py
+# Throughput benchmarks for the training hot paths. Every benchmark runs with
+# fixed seeds, results are written as JSON, and a stored baseline is used to
+# flag regressions:
+#
+#   python bench.py --save-baseline     # record bench_baseline.json
+#   python bench.py                     # run, write bench_results.json, compare
+#
+# The exit status is 1 when any metric is worse than the baseline by more than
+# the tolerance.
+import os
+import io
+import sys
+import json
+import time
+import random
+import pickle
+import argparse
+import platform
+import tempfile
+import contextlib
+from datetime import datetime
+
+import numpy as np
+import neat
+
+import train_neat
+from env import SoccerEnv, OBS_SIZE, STATE_SIZE
+from compiled_net import NetPlan, ScalarNet
+from train_neat import get_agent2_action
+
+LOCAL_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(LOCAL_DIR, "config-feedforward.txt")
+WINNER_PATH = os.path.join(LOCAL_DIR, "winner.pkl")
+RESULTS_PATH = "bench_results.json"
+BASELINE_PATH = "bench_baseline.json"
+
+SEED = 1234
+REPEATS = 3  # each benchmark keeps its best run
+HEADLESS_STEPS = 20000
+RENDERED_STEPS = 500
+ACTIVATIONS = 20000
+STATE_ROUNDTRIPS = 5000
+EVAL_GENOMES = 3
+GENERATIONS = 2
+TOLERANCE = 0.15  # relative slowdown allowed before a metric counts as a regression
+
+
+def load_config():
+    return neat.Config(
+        neat.DefaultGenome,
+        neat.DefaultReproduction,
+        neat.DefaultSpeciesSet,
+        neat.DefaultStagnation,
+        CONFIG_PATH
+    )
+
+
+def load_winner():
+    with open(WINNER_PATH, "rb") as f:
+        return pickle.load(f)
+
+
+# Runs fn REPEATS times and returns the fastest wall time
+def best_time(fn):
+    times = []
+    for _ in range(REPEATS):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+    return min(times)
+
+
+# Steps the env against the scripted opponent with a fixed random action sequence
+def run_steps(env, n_steps):
+    actions = np.random.default_rng(SEED).integers(0, 5, n_steps).tolist()
+
+    def run():
+        env.seed(SEED)
+        env.reset()
+        for a1 in actions:
+            _, _, done, _, _ = env.step(a1, get_agent2_action(env))
+            if done:
+                env.reset()
+    return run
+
+
+def bench_env_step_headless():
+    env = SoccerEnv(render_mode=False)
+    return HEADLESS_STEPS / best_time(run_steps(env, HEADLESS_STEPS))
+
+
+# Same steps through step_into and one reused observation buffer
+def bench_env_step_into():
+    env = SoccerEnv(render_mode=False)
+    actions = np.random.default_rng(SEED).integers(0, 5, HEADLESS_STEPS).tolist()
+    obs = np.empty(OBS_SIZE, dtype=np.float32)
+
+    def run():
+        env.seed(SEED)
+        env.reset()
+        for a1 in actions:
+            _, done, _ = env.step_into(a1, get_agent2_action(env), obs)
+            if done:
+                env.reset()
+    return HEADLESS_STEPS / best_time(run)
+
+
+# get_state into a reused buffer and set_state from it on another env, mid-match
+def bench_env_state_roundtrip():
+    env = SoccerEnv(render_mode=False, seed=SEED)
+    copy = SoccerEnv(render_mode=False)
+    run_steps(env, 100)()
+    state = np.empty(STATE_SIZE, dtype=np.int64)
+
+    def run():
+        for _ in range(STATE_ROUNDTRIPS):
+            copy.set_state(env.get_state(state))
+    return STATE_ROUNDTRIPS / best_time(run)
+
+
+def bench_env_step_rendered():
+    # Offscreen and unthrottled: measures drawing cost, not the 60 FPS clock
+    from render import PygameRenderer
+    os.chdir(LOCAL_DIR)  # assets are loaded relative to the repo
+    env = SoccerEnv(renderer=PygameRenderer(fps=0, offscreen=True))
+    return RENDERED_STEPS / best_time(run_steps(env, RENDERED_STEPS))
+
+
+def bench_net_activation(config, winner):
+    net = neat.nn.FeedForwardNetwork.create(winner, config)
+    inputs = np.random.default_rng(SEED).random((ACTIVATIONS, 9)).tolist()
+
+    def run():
+        for x in inputs:
+            net.activate(x)
+    return ACTIVATIONS / best_time(run)
+
+
+def bench_net_activation_compiled(config, winner):
+    net = ScalarNet(NetPlan(winner, config))
+    # float32 observations, as the evaluation feeds them
+    inputs = np.random.default_rng(SEED).random((ACTIVATIONS, 9)).astype(np.float32)
+
+    def run():
+        for x in inputs:
+            net.activate(x)
+    return ACTIVATIONS / best_time(run)
+
+
+def bench_eval_genome(config, winner):
+    env = SoccerEnv(render_mode=False)
+
+    def run():
+        for _ in range(EVAL_GENOMES):
+            train_neat.play_genome(winner, config, env)
+    return best_time(run) / EVAL_GENOMES
+
+
+# Wall time per generation of the run_neat loop, cache and logging included.
+# Every repeat starts with empty caches, so none reuses networks or results of
+# the one before. Runs inside a scratch directory since generations write their
+# logs to the cwd.
+def bench_generation(config):
+    def run():
+        train_neat.generation_counter[0] = 0
+        train_neat.max_fitnesses.clear()
+        train_neat.goal_ratio.clear()
+        train_neat.fitness_cache = train_neat.FitnessCache()
+        train_neat.net_cache.clear()
+        random.seed(SEED)
+        population = neat.Population(config)
+        population.run(train_neat.eval_genomes, GENERATIONS)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            return best_time(run) / GENERATIONS
+        finally:
+            os.chdir(cwd)
+
+
+# name -> (unit, higher is better)
+METRICS = {
+    "env_step_headless": ("steps/s", True),
+    "env_step_into": ("steps/s", True),
+    "env_step_rendered": ("steps/s", True),
+    "env_state_roundtrip": ("roundtrips/s", True),
+    "net_activation": ("activations/s", True),
+    "net_activation_compiled": ("activations/s", True),
+    "eval_genome": ("s", False),
+    "generation": ("s", False),
+}
+
+
+def run_benchmarks(selected=None):
+    config = load_config()
+    winner = load_winner()
+    benches = {
+        "env_step_headless": bench_env_step_headless,
+        "env_step_into": bench_env_step_into,
+        "env_step_rendered": bench_env_step_rendered,
+        "env_state_roundtrip": bench_env_state_roundtrip,
+        "net_activation": lambda: bench_net_activation(config, winner),
+        "net_activation_compiled": lambda: bench_net_activation_compiled(config, winner),
+        "eval_genome": lambda: bench_eval_genome(config, winner),
+        "generation": lambda: bench_generation(config),
+    }
+    cwd = os.getcwd()
+    results = {}
+    for name, bench in benches.items():
+        if selected and name not in selected:
+            continue
+        print(f"Running {name}...")
+        try:
+            value = bench()
+        finally:
+            os.chdir(cwd)
+        unit, higher_is_better = METRICS[name]
+        results[name] = {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+        print(f"  {name}: {value:.6g} {unit}")
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "seed": SEED,
+        "metrics": results,
+    }
+
+
+# Returns the metrics that got worse than the baseline by more than tolerance
+def compare(results, baseline, tolerance=TOLERANCE):
+    regressions = []
+    for name, metric in results["metrics"].items():
+        base = baseline.get("metrics", {}).get(name)
+        if base is None:
+            continue
+        if metric["higher_is_better"]:
+            change = metric["value"] / base["value"] - 1.0
+        else:
+            change = base["value"] / metric["value"] - 1.0
+        status = "REGRESSION" if change < -tolerance else "ok"
+        print(f"{name:20s} {base['value']:12.6g} -> {metric['value']:12.6g} {metric['unit']:14s} {change:+7.1%}  {status}")
+        if change < -tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark env stepping, network activation and evaluation")
+    parser.add_argument("--output", default=RESULTS_PATH, help="where to write the results JSON")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed relative slowdown")
+    parser.add_argument("--only", nargs="+", choices=list(METRICS), help="run a subset of the benchmarks")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.only)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"✔ Results saved to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✔ Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"✘ Regressions: {', '.join(regressions)}")
+        return 1
+    print("✔ No regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
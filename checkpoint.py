@@ -0,0 +1,139 @@
+# checkpoint.py
+# Crash-safe training state. A checkpoint is a gzipped pickle of everything a
+# NEAT run needs to carry on exactly where it stopped: the population, species,
+# the reproduction and id counters, and the random module's state, plus whatever
+# the training script adds. It is written to a temporary file and moved over the
+# old one, so a crash mid-write never leaves a broken checkpoint behind.
+#
+# AppendLog is a CSV that gets its rows as they are produced and is fsynced every
+# time, so statistics survive a crash too. Checkpoints store the log offsets, and
+# resuming truncates the logs back to them: rows written after the last
+# checkpoint are dropped, since those generations are played again.
+import os
+import csv
+import gzip
+import pickle
+import random
+from itertools import count
+
+import neat
+
+CHECKPOINT_PATH = "neat_checkpoint.pkl.gz"
+CHECKPOINT_INTERVAL = 5  # generations between checkpoints
+VERSION = 1
+
+
+def save_checkpoint(path, state):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        with gzip.GzipFile(fileobj=f, mode="wb", compresslevel=6) as gz:
+            pickle.dump({"version": VERSION, **state}, gz, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path):
+    with gzip.open(path, "rb") as f:
+        state = pickle.load(f)
+    if state.get("version") != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} checkpoint")
+    return state
+
+
+# One of the settings the training script saved with the run (see
+# train_neat._training_state), or default when there is no checkpoint at path
+def run_setting(name, default, path=CHECKPOINT_PATH):
+    if not os.path.exists(path):
+        return default
+    return load_checkpoint(path).get(name, default)
+
+
+# Next value of an itertools.count, leaving the counter where it was
+def _peek(owner, attr):
+    value = next(getattr(owner, attr))
+    setattr(owner, attr, count(value))
+    return value
+
+
+# State of a population between generations (after speciation). Reporters are left
+# out: they hold references to the training script, not evolutionary state.
+def population_state(population):
+    config = population.config
+    species = population.species
+    node_indexer = config.genome_config.node_indexer
+    return {
+        "generation": population.generation + 1,  # the generation that runs next
+        "population": population.population,
+        "species": species.species,
+        "genome_to_species": species.genome_to_species,
+        "next_species_key": _peek(species, "indexer"),
+        "next_genome_key": _peek(population.reproduction, "genome_indexer"),
+        "ancestors": population.reproduction.ancestors,
+        "next_node_key": None if node_indexer is None else _peek(config.genome_config, "node_indexer"),
+        "best_genome": population.best_genome,
+        "random": random.getstate(),
+    }
+
+
+# Rebuilds a population from population_state, using the run's config
+def restore_population(state, config):
+    population = neat.Population(config, (state["population"], None, state["generation"]))
+    species = config.species_set_type(config.species_set_config, population.reporters)
+    species.species = state["species"]
+    species.genome_to_species = state["genome_to_species"]
+    species.indexer = count(state["next_species_key"])
+    population.species = species
+    population.reproduction.genome_indexer = count(state["next_genome_key"])
+    population.reproduction.ancestors = state["ancestors"]
+    if state["next_node_key"] is not None:
+        config.genome_config.node_indexer = count(state["next_node_key"])
+    population.best_genome = state["best_genome"]
+    random.setstate(state["random"])
+    return population
+
+
+# Reporter that checkpoints the population every interval generations. extra()
+# returns the training script's own state to store alongside it.
+class Checkpointer(neat.reporting.BaseReporter):
+
+    def __init__(self, population, path=CHECKPOINT_PATH, interval=CHECKPOINT_INTERVAL, extra=None):
+        self.population = population
+        self.path = path
+        self.interval = interval
+        self.extra = extra
+
+    def end_generation(self, config, population, species_set):
+        generation = self.population.generation + 1
+        if generation % self.interval:
+            return
+        state = population_state(self.population)
+        if self.extra is not None:
+            state.update(self.extra())
+        save_checkpoint(self.path, state)
+        print(f"✔ Checkpoint saved to {self.path} (generation {generation})")
+
+
+class AppendLog:
+
+    # With offset set (from a checkpoint) the file is cut back to that length first
+    def __init__(self, path, header=None, offset=None):
+        self.path = path
+        if offset is not None and os.path.exists(path):
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+        self.file = open(path, "a", newline="")
+        self.writer = csv.writer(self.file)
+        if header and self.file.tell() == 0:
+            self.write([header])
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def offset(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
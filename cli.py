@@ -0,0 +1,89 @@
+# cli.py
+# One entry point for the project:
+#
+#   python cli.py train [--workers 4 --racing ...]     # train_neat.py
+#   python cli.py evaluate winner.pkl best_gen_gen10.pkl
+#   python cli.py visualize [winner.pkl]               # agent_test.py
+#   python cli.py tournament [--workers 8]             # tournament.py
+#   python cli.py bench [--only env_step]              # bench.py
+#   python cli.py replay best_gen_gen10.rpl --render   # replay.py
+#   python cli.py worker HOST:PORT                     # distributed.py
+#
+# Nothing heavy is imported up front: each command imports its own module when
+# it runs, pygame is only loaded by the commands that draw (visualize, replay
+# --render/--export) and neat only by those that run networks, and
+# `python cli.py --help` starts at once. The rest of each command line goes to
+# that module's own parser (python cli.py train --help).
+import sys
+import argparse
+import importlib
+
+# command -> (module whose main(argv) runs it, help)
+COMMANDS = {
+    "train": ("train_neat", "train NEAT agents"),
+    "evaluate": (None, "score saved genomes headless, without pygame"),
+    "visualize": ("agent_test", "watch saved genomes play"),
+    "tournament": ("tournament", "rate checkpoints and scripted opponents in a round robin"),
+    "bench": ("bench", "run the throughput benchmarks"),
+    "replay": ("replay", "inspect, watch or export a recorded match"),
+    "worker": ("distributed", "evaluate for a remote training (train --listen)"),
+}
+
+
+# Plays each genome's evaluation matches (the same ones training gave it) and
+# prints its fitness and goals
+def evaluate(argv=None):
+    parser = argparse.ArgumentParser(prog="cli.py evaluate", description=COMMANDS["evaluate"][1])
+    parser.add_argument("genomes", nargs="+", help="genome .pkl files")
+    parser.add_argument("--config", default="config-feedforward.txt", help="NEAT config file")
+    parser.add_argument("--episodes", type=int, help="matches per genome (default: as in training)")
+    parser.add_argument("--decision-interval", type=int, help="physics steps per decision (default: as in training)")
+    parser.add_argument("--checkpoint", help="training checkpoint the defaults come from "
+                                             "(default: train_neat's checkpoint path)")
+    args = parser.parse_args(argv)
+    if args.decision_interval is not None and args.decision_interval < 1:
+        parser.error("--decision-interval must be at least 1")
+
+    import pickle
+    import neat
+    import train_neat
+    from env import SoccerEnv
+    from checkpoint import run_setting, CHECKPOINT_PATH
+
+    # The run's own matches: its seed and, unless overridden, its decision interval
+    checkpoint = args.checkpoint or CHECKPOINT_PATH
+    train_neat.SEED = run_setting("seed", train_neat.SEED, checkpoint)
+    train_neat.DECISION_INTERVAL = (args.decision_interval or
+                                    run_setting("decision_interval", train_neat.DECISION_INTERVAL, checkpoint))
+    episodes = args.episodes or train_neat.EPISODES
+    config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                         neat.DefaultStagnation, args.config)
+    env = SoccerEnv(render_mode=False)
+    print(f"{'genome':30s} {'fitness':>10s} {'scored':>7s} {'conceded':>9s} {'steps':>7s}")
+    for path in args.genomes:
+        with open(path, "rb") as f:
+            genome = pickle.load(f)
+        progress = train_neat.play_episodes(genome, config, env, episodes)
+        print(f"{path:30s} {progress.fitness():10.4f} {progress.scored:7d} {progress.conceded:9d} {progress.steps:7d}")
+    return 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(prog="cli.py", description="AI soccer: training, evaluation and tools")
+    parser.add_argument("command", choices=list(COMMANDS), metavar="command",
+                        help="; ".join(f"{name}: {help}" for name, (_, help) in COMMANDS.items()))
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="arguments for the command (see cli.py <command> -h)")
+    # Only the command name is ours, so `cli.py train -h` reaches train's parser
+    args = parser.parse_args(argv[:1])
+
+    module_name = COMMANDS[args.command][0]
+    if module_name is None:
+        return evaluate(argv[1:])
+    module = importlib.import_module(module_name)
+    sys.argv[0] = f"cli.py {args.command}"
+    return module.main(argv[1:])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,310 @@
+# compiled_net.py
+# Compiles NEAT genomes into NumPy array programs. A genome becomes a dense
+# weight matrix over a value buffer (inputs first, then hidden/output nodes in
+# neat's feed-forward order) plus one mask per layer, and a whole population is
+# the same thing stacked along a leading genome axis. Evaluating a batch of
+# observations for every genome is then a handful of matmuls per layer instead
+# of neat.nn.FeedForwardNetwork.activate's Python loop over nodes and links.
+# Outputs agree with activate up to float summation order.
+#
+# ScalarNet is the one-observation counterpart used by the scripted evaluation:
+# each plan becomes one generated straight-line Python function that repeats
+# activate's arithmetic exactly, minus the bookkeeping, and NetCache keeps the
+# compiled functions of recently seen genomes.
+import math
+import collections
+
+import numpy as np
+from neat.graphs import feed_forward_layers
+
+from fitness_cache import genome_hash
+
+# Activation and aggregation functions allowed by config-feedforward.txt
+ACTIVATIONS = ("tanh", "sigmoid", "relu", "identity")
+AGGREGATIONS = ("sum", "max", "min")
+
+
+# Same clamping and scaling as neat.activations
+def _tanh(z):
+    return np.tanh(np.clip(2.5 * z, -60.0, 60.0))
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(5.0 * z, -60.0, 60.0)))
+
+
+def _relu(z):
+    return np.where(z > 0.0, z, 0.0)
+
+
+def _identity(z):
+    return z
+
+
+ACTIVATION_FUNCS = (_tanh, _sigmoid, _relu, _identity)
+
+
+# Evaluation order of one genome: the layers neat's FeedForwardNetwork would build
+# and, for every evaluated node, its incoming enabled links
+class NetPlan:
+
+    def __init__(self, genome, config):
+        genome_config = config.genome_config
+        self.input_keys = list(genome_config.input_keys)
+        self.output_keys = list(genome_config.output_keys)
+
+        connections = [cg.key for cg in genome.connections.values() if cg.enabled]
+        self.layers = [sorted(layer) for layer in feed_forward_layers(self.input_keys, self.output_keys, connections)]
+        self.nodes = [node for layer in self.layers for node in layer]
+
+        evaluated = set(self.nodes)
+        links = {node: [] for node in self.nodes}
+        for inode, onode in connections:
+            if onode in evaluated:
+                links[onode].append((inode, genome.connections[(inode, onode)].weight))
+
+        # neat also evaluates nodes that only feed outputs it never reaches (an
+        # output with an input it cannot evaluate stays 0.0); those are dropped
+        live = set(key for key in self.output_keys if key in evaluated)
+        stack = list(live)
+        while stack:
+            for inode, _ in links[stack.pop()]:
+                if inode in evaluated and inode not in live:
+                    live.add(inode)
+                    stack.append(inode)
+        self.pruned = len(self.nodes) - len(live)
+        self.layers = [layer for layer in ([node for node in layer if node in live] for layer in self.layers) if layer]
+        self.nodes = [node for layer in self.layers for node in layer]
+        self.links = {node: links[node] for node in self.nodes}
+
+        self.params = {}
+        for node in self.nodes:
+            ng = genome.nodes[node]
+            if ng.activation not in ACTIVATIONS:
+                raise ValueError(f"Activation '{ng.activation}' is not supported by the compiled network")
+            if ng.aggregation not in AGGREGATIONS:
+                raise ValueError(f"Aggregation '{ng.aggregation}' is not supported by the compiled network")
+            self.params[node] = (ng.bias, ng.response, ACTIVATIONS.index(ng.activation), AGGREGATIONS.index(ng.aggregation))
+
+
+# A stack of compiled genomes evaluated together. Columns are laid out in blocks,
+# one per feed-forward depth and as wide as the widest genome at that depth, so
+# each depth is one batched matmul over the columns computed before it.
+# activate takes observations shaped (n_genomes, batch, n_inputs) or
+# (n_genomes, n_inputs) and returns the outputs with the same leading shape.
+class PopulationNet:
+
+    def __init__(self, plans):
+        self.n_genomes = len(plans)
+        self.n_inputs = len(plans[0].input_keys)
+        self.n_outputs = len(plans[0].output_keys)
+        n_depths = max(len(plan.layers) for plan in plans)
+        widths = [max((len(plan.layers[d]) for plan in plans if d < len(plan.layers)), default=0)
+                  for d in range(n_depths)]
+        self.blocks = []
+        start = self.n_inputs
+        for width in widths:
+            self.blocks.append((start, start + width))
+            start += width
+        n_cols = start + 1
+        zero_col = n_cols - 1  # never written: outputs neat would not evaluate read 0.0 here
+        shape = (self.n_genomes, n_cols)
+
+        weights = np.zeros((self.n_genomes, n_cols, n_cols))  # [genome, source col, node col]
+        linked = np.zeros((self.n_genomes, n_cols, n_cols), dtype=bool)
+        bias = np.zeros(shape)
+        response = np.zeros(shape)
+        activation = np.zeros(shape, dtype=np.int8)
+        aggregation = np.zeros(shape, dtype=np.int8)
+        self.output_cols = np.full((self.n_genomes, self.n_outputs), zero_col, dtype=np.intp)
+
+        for g, plan in enumerate(plans):
+            cols = {key: i for i, key in enumerate(plan.input_keys)}
+            for depth, layer in enumerate(plan.layers):
+                for i, node in enumerate(layer):
+                    cols[node] = self.blocks[depth][0] + i
+            for node in plan.nodes:
+                col = cols[node]
+                bias[g, col], response[g, col], activation[g, col], aggregation[g, col] = plan.params[node]
+                for inode, weight in plan.links[node]:
+                    weights[g, cols[inode], col] = weight
+                    linked[g, cols[inode], col] = True
+            for i, key in enumerate(plan.output_keys):
+                if key in cols:
+                    self.output_cols[g, i] = cols[key]
+
+        # Per depth: the weights into the block from every earlier column and the node parameters
+        self.n_cols = n_cols
+        self.steps = []
+        for start, end in self.blocks:
+            agg = aggregation[:, None, start:end]
+            act = activation[:, None, start:end]
+            has_links = linked[:, :start, start:end].any(axis=1)[:, None, :]
+            self.steps.append({
+                "start": start,
+                "end": end,
+                "weights": weights[:, :start, start:end],
+                "linked": linked[:, None, :start, start:end],
+                "bias": bias[:, None, start:end],
+                "response": response[:, None, start:end],
+                # Columns without links would reduce to +-inf; they are never read
+                "max": (agg == AGGREGATIONS.index("max")) & has_links,
+                "min": (agg == AGGREGATIONS.index("min")) & has_links,
+                "uses_max": bool((agg == AGGREGATIONS.index("max")).any()),
+                "uses_min": bool((agg == AGGREGATIONS.index("min")).any()),
+                "activations": [(i, act == i) for i in range(len(ACTIVATIONS)) if (act == i).any()],
+            })
+
+    def activate(self, inputs):
+        inputs = np.asarray(inputs, dtype=np.float64)
+        single = inputs.ndim == 2
+        if single:
+            inputs = inputs[:, None, :]
+        n_genomes, batch, n_inputs = inputs.shape
+        if n_genomes != self.n_genomes or n_inputs != self.n_inputs:
+            raise RuntimeError(f"Expected inputs shaped ({self.n_genomes}, batch, {self.n_inputs}), got {inputs.shape}")
+
+        values = np.zeros((n_genomes, batch, self.n_cols))
+        values[:, :, :n_inputs] = inputs
+
+        for step in self.steps:
+            start = step["start"]
+            prev = values[:, :, :start]
+            s = prev @ step["weights"]
+            if step["uses_max"] or step["uses_min"]:
+                # (genome, batch, source, node) weighted inputs, only where a link exists
+                weighted = prev[:, :, :, None] * step["weights"][:, None, :, :]
+                if step["uses_max"]:
+                    s_max = np.where(step["linked"], weighted, -np.inf).max(axis=2)
+                    s = np.where(step["max"], s_max, s)
+                if step["uses_min"]:
+                    s_min = np.where(step["linked"], weighted, np.inf).min(axis=2)
+                    s = np.where(step["min"], s_min, s)
+            z = step["bias"] + step["response"] * s
+            activations = step["activations"]
+            if len(activations) == 1:
+                out = ACTIVATION_FUNCS[activations[0][0]](z)
+            else:
+                out = np.zeros_like(z)
+                for act, where in activations:
+                    out = np.where(where, ACTIVATION_FUNCS[act](z), out)
+            values[:, :, start:step["end"]] = out
+
+        cols = np.broadcast_to(self.output_cols[:, None, :], (n_genomes, batch, self.n_outputs))
+        outputs = np.take_along_axis(values, cols, axis=2)
+        return outputs[:, 0, :] if single else outputs
+
+
+# A single compiled genome. activate mirrors FeedForwardNetwork.activate for one
+# observation; activate_batch takes (batch, n_inputs) and returns (batch, n_outputs).
+class CompiledNet:
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.population = PopulationNet([plan])
+
+    def activate(self, inputs):
+        return self.population.activate(np.asarray(inputs)[None, :])[0].tolist()
+
+    def activate_batch(self, inputs):
+        return self.population.activate(np.asarray(inputs)[None, :, :])[0]
+
+
+def compile_genome(genome, config):
+    return CompiledNet(NetPlan(genome, config))
+
+
+def compile_population(genomes, config):
+    return PopulationNet([NetPlan(genome, config) for genome in genomes])
+
+
+# Straight-line source of a plan's activate. Operations and their order are
+# FeedForwardNetwork.activate's (links in connection order, the same clamps),
+# so results are identical, float32 inputs included; only work that cannot
+# change a value is left out: aggregating a single input, identity activations,
+# responses of 1.0, biases of 0.0 and tanh's clamp, which never moves
+# math.tanh's result.
+def scalar_source(plan):
+    names = {key: f"x{i}" for i, key in enumerate(plan.input_keys)}
+    lines = [f"def activate(inputs):", f"    {', '.join(names[key] for key in plan.input_keys)}, = inputs"]
+    for node in plan.nodes:
+        bias, response, activation, aggregation = plan.params[node]
+        terms = [f"{names[inode]} * {weight!r}" for inode, weight in plan.links[node]]
+        if len(terms) == 1:
+            z = terms[0]
+        elif AGGREGATIONS[aggregation] == "sum":
+            z = " + ".join(terms)
+        else:
+            z = f"{AGGREGATIONS[aggregation]}({', '.join(terms)})"
+        if response != 1.0:
+            z = f"{response!r} * ({z})"
+        if bias != 0.0:
+            z = f"{bias!r} + {z}"
+        name = names[node] = f"v{node}"
+        kind = ACTIVATIONS[activation]
+        if kind == "tanh":
+            lines.append(f"    {name} = tanh(2.5 * ({z}))")
+        elif kind == "sigmoid":
+            lines.append(f"    {name} = 1.0 / (1.0 + exp(-max(-60.0, min(60.0, 5.0 * ({z})))))")
+        elif kind == "relu":
+            lines.append(f"    z = {z}")
+            lines.append(f"    {name} = z if z > 0.0 else 0.0")
+        else:
+            lines.append(f"    {name} = {z}")
+    outputs = [names.get(key, "0.0") for key in plan.output_keys]  # outputs neat never evaluates read 0.0
+    lines.append(f"    return [{', '.join(outputs)}]")
+    return "\n".join(lines) + "\n"
+
+
+# A single genome compiled to a generated function; activate returns the same
+# list FeedForwardNetwork.activate would
+class ScalarNet:
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.source = scalar_source(plan)
+        namespace = {"tanh": math.tanh, "exp": math.exp}
+        exec(compile(self.source, "<compiled genome>", "exec"), namespace)
+        self._activate = namespace["activate"]
+
+    def activate(self, inputs):
+        return self._activate(inputs)
+
+    # The generated function is rebuilt from the plan after unpickling
+    def __getstate__(self):
+        return {"plan": self.plan}
+
+    def __setstate__(self, state):
+        self.__init__(state["plan"])
+
+
+NET_CACHE_SIZE = 512  # compiled genomes kept, least recently used dropped first
+
+
+# Compiled ScalarNets by genome_hash. Elites, hall of fame members and checkpoints
+# that come back are served without compiling them again.
+class NetCache:
+
+    def __init__(self, size=NET_CACHE_SIZE):
+        self.size = size
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, genome, config):
+        key = genome_hash(genome)
+        net = self.entries.get(key)
+        if net is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return net
+        self.misses += 1
+        net = self.entries[key] = ScalarNet(NetPlan(genome, config))
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return net
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
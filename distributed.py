@@ -0,0 +1,267 @@
+# distributed.py
+# Genome evaluation over TCP. run_neat can act as a coordinator that listens for
+# workers (on other machines, or on localhost for testing) and hands them batches
+# of evaluation tasks. Workers play them on a headless SoccerEnv with the
+# coordinator's config and evaluation settings, so results match single-node
+# evaluation for the same seed.
+#
+#   python train_neat.py --listen 0.0.0.0:5555      # coordinator
+#   python distributed.py coordinator-host:5555     # on every worker node
+#
+# Workers pull work: a worker gets its next batch when it returns the last one,
+# so fast nodes do more. Batches shrink as the queue drains (about half the
+# remaining tasks per worker, at most batch_size) so round trips are amortised
+# without leaving a long tail. Once the queue is empty an idle worker steals the
+# unfinished second half of the largest batch still out, and whichever copy of a
+# task finishes first is used. A batch out for longer than timeout is assumed
+# lost (dead node, dropped link) and queued again.
+#
+# Messages are pickles sent over multiprocessing.connection and the link is
+# authenticated with a shared key, but only run this on networks you trust.
+import sys
+import time
+import logging
+import argparse
+import threading
+import collections
+from multiprocessing.connection import Listener, Client, AuthenticationError
+
+import train_neat
+from env import SoccerEnv
+from profiler import profiler
+
+PORT = 5555
+AUTHKEY = b"ai_soccer"
+BATCH_SIZE = 16  # most tasks sent in one message
+TIMEOUT = 120.0  # seconds before a batch is given up on and queued again
+CONNECT_RETRY = 30.0  # seconds a worker keeps trying to reach the coordinator
+# train_neat settings an evaluation depends on, copied to every worker
+SETTINGS = ("EPISODES", "MAX_STEPS", "DECISION_INTERVAL", "SEED")
+
+logger = logging.getLogger("distributed")
+
+
+# "host:port" or "host" -> (host, port)
+def parse_address(text):
+    host, _, port = text.rpartition(":")
+    if not host:
+        return text, PORT
+    return host, int(port)
+
+
+class Coordinator:
+
+    def __init__(self, address, config, authkey=AUTHKEY, batch_size=BATCH_SIZE, timeout=TIMEOUT):
+        self.config = config
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.listener = Listener(address, authkey=authkey)
+        self.address = self.listener.address
+        self.lock = threading.Condition()
+        self.queue = collections.deque()  # task ids not handed out yet
+        self.tasks = {}  # task id -> task of the current run
+        self.results = {}  # task id -> EvalProgress
+        self.batches = {}  # batch id -> (worker, task ids, time sent)
+        self.stolen = set()  # task ids already handed out twice
+        self.workers = 0
+        self.next_task = 0  # ids keep counting across runs, so late results of an old run are ignored
+        self.next_batch = 0
+        self.closed = False
+        threading.Thread(target=self._accept, daemon=True).start()
+        logger.info("Coordinator listening on %s:%d", *self.address)
+
+    # Evaluates (genome, n_episodes, progress, log_path) tasks on the workers and
+    # returns their progress in task order, like train_neat._run_episodes
+    def run(self, tasks):
+        with self.lock:
+            ids = list(range(self.next_task, self.next_task + len(tasks)))
+            self.next_task += len(tasks)
+            self.tasks = dict(zip(ids, tasks))
+            self.results = {}
+            self.stolen = set()
+            self.queue.extend(ids)
+            self.lock.notify_all()
+            waiting = False
+            while len(self.results) < len(ids):
+                if not self.workers and not waiting:
+                    logger.info("Waiting for workers on %s:%d", *self.address)
+                waiting = not self.workers
+                self.lock.wait(1.0)
+                self._expire()
+            results = [self.results[i] for i in ids]
+            self.tasks = {}
+            self.results = {}
+            self.queue.clear()
+            self.batches.clear()
+            return results
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.lock.notify_all()
+        self.listener.close()
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except AuthenticationError:
+                logger.warning("Rejected a worker with the wrong key")
+                continue
+            except OSError:
+                return  # listener closed
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    # One thread per connected worker
+    def _serve(self, conn):
+        worker = id(conn)
+        with self.lock:
+            self.workers += 1
+            logger.info("Worker connected (%d total)", self.workers)
+        try:
+            settings = {name: getattr(train_neat, name) for name in SETTINGS}
+            conn.send(("setup", self.config, settings, profiler.enabled))
+            while True:
+                message = conn.recv()
+                if message[0] == "results":
+                    self._finish(message[1], message[2])
+                batch = self._next_batch(worker)
+                if batch is None:
+                    conn.send(("stop",))
+                    return
+                conn.send(("batch",) + batch)
+        except (EOFError, OSError):
+            pass
+        finally:
+            with self.lock:
+                self.workers -= 1
+                # Anything this worker still had goes back to the front of the queue
+                for batch_id, (owner, ids, _) in list(self.batches.items()):
+                    if owner == worker:
+                        del self.batches[batch_id]
+                        self._requeue(ids)
+                self.lock.notify_all()
+                if not self.closed:
+                    logger.warning("Worker disconnected (%d left)", self.workers)
+            conn.close()
+
+    # Blocks until there is work for the worker; None once the coordinator closes
+    def _next_batch(self, worker):
+        with self.lock:
+            while not self.closed:
+                self._expire()
+                while self.queue and self.queue[0] in self.results:
+                    self.queue.popleft()
+                if self.queue:
+                    size = min(self.batch_size, max(1, len(self.queue) // (2 * self.workers)))
+                    ids = []
+                    while self.queue and len(ids) < size:
+                        task_id = self.queue.popleft()
+                        if task_id not in self.results:
+                            ids.append(task_id)
+                else:
+                    ids = self._steal(worker)
+                if not ids:
+                    self.lock.wait(1.0)
+                    continue
+                batch_id = self.next_batch
+                self.next_batch += 1
+                self.batches[batch_id] = (worker, ids, time.monotonic())
+                return batch_id, [(task_id, self.tasks[task_id]) for task_id in ids]
+        return None
+
+    # Second half of the unfinished tasks of the largest batch held by another worker
+    def _steal(self, worker):
+        best = []
+        for owner, ids, _ in self.batches.values():
+            if owner == worker:
+                continue
+            unfinished = [i for i in ids if i not in self.results and i not in self.stolen]
+            if len(unfinished) > len(best):
+                best = unfinished
+        ids = best[len(best) // 2:]
+        self.stolen.update(ids)
+        return ids
+
+    def _expire(self):
+        now = time.monotonic()
+        for batch_id, (_, ids, sent) in list(self.batches.items()):
+            if now - sent > self.timeout:
+                logger.warning("Batch %d timed out, dispatching its tasks again", batch_id)
+                del self.batches[batch_id]
+                self._requeue(ids)
+
+    def _requeue(self, ids):
+        self.queue.extendleft(reversed([i for i in ids if i in self.tasks and i not in self.results]))
+        self.lock.notify_all()
+
+    def _finish(self, batch_id, results):
+        with self.lock:
+            self.batches.pop(batch_id, None)
+            for task_id, progress, stats in results:
+                # Results of an old run or of a task finished elsewhere first are dropped
+                if task_id in self.tasks and task_id not in self.results:
+                    self.results[task_id] = progress
+                    if stats is not None:
+                        profiler.merge(stats)
+            self.lock.notify_all()
+
+
+def _connect(address, authkey, retry):
+    deadline = time.monotonic() + retry
+    while True:
+        try:
+            return Client(address, authkey=authkey)
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(1.0)
+
+
+# Evaluates batches from the coordinator at address until it stops or goes away
+def run_worker(address, authkey=AUTHKEY, retry=CONNECT_RETRY):
+    conn = _connect(address, authkey, retry)
+    _, config, settings, profile = conn.recv()
+    for name, value in settings.items():
+        setattr(train_neat, name, value)
+    if profile:
+        profiler.enable()
+    env = SoccerEnv(render_mode=False)
+    logger.info("Connected to %s:%d", *address)
+
+    evaluated = 0
+    conn.send(("ready",))
+    try:
+        while True:
+            message = conn.recv()
+            if message[0] == "stop":
+                break
+            _, batch_id, tasks = message
+            results = []
+            for task_id, (genome, n_episodes, progress, log_path) in tasks:
+                progress = train_neat.play_episodes(genome, config, env, n_episodes, progress, log_path)
+                results.append((task_id, progress, profiler.take() if profiler.enabled else None))
+            conn.send(("results", batch_id, results))
+            evaluated += len(tasks)
+    except (EOFError, OSError):
+        pass
+    finally:
+        conn.close()
+    logger.info("Coordinator gone, %d evaluations done", evaluated)
+    return evaluated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate genomes for a train_neat.py --listen coordinator")
+    parser.add_argument("address", help="coordinator host:port")
+    parser.add_argument("--authkey", default=AUTHKEY.decode(), help="shared key, must match the coordinator's")
+    parser.add_argument("--retry", type=float, default=CONNECT_RETRY, help="seconds to keep trying to connect")
+    parser.add_argument("--verbose", action="store_true", help="log every episode and goal")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s")
+    run_worker(parse_address(args.address), args.authkey.encode(), args.retry)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,14 @@
 # env.py
-import pygame
 import numpy as np
+import math
 import random
+import struct
+import logging
+
+from physics import Rect
+from profiler import profiler
+
+logger = logging.getLogger(__name__)
 
 WIDTH, HEIGHT = 640, 480
 PLAYER_SIZE = 20
@@ -9,53 +16,96 @@ BALL_SIZE = 10
 PLAYER_SPEED = 5
 BALL_SPEED = 6
 GOAL_WIDTH = 80
+OBS_SIZE = 9
+
+# Observation layout written straight into a float32 buffer
+_OBS = struct.Struct(f"<{OBS_SIZE}f")
+# Everything a match continues from, as int64: the x, y of p1, p2, ball, gk1 and
+# gk2, ball velocity, possession, done, stepcount, the random stream's cached
+# gauss (flag and float bits) and its Mersenne Twister state (624 words + index)
+_STATE_HEADER = struct.Struct("<17q")
+_STATE_MT = struct.Struct("<625q")
+STATE_SIZE = 17 + 625
+_RNG_VERSION = 3
+KICK_RIGHT = (1, 0)
+KICK_LEFT = (-1, 0)
 
 class SoccerEnv:
 
-    def load_assets(self):
-        self.field_image = pygame.image.load("assets/field.png").convert_alpha()
-        self.field_image = pygame.transform.scale(self.field_image, (WIDTH, HEIGHT))
-
-        self.player1_image = pygame.image.load("assets/right_player_img.png").convert_alpha()
-        self.player1_image = pygame.transform.scale(self.player1_image, (PLAYER_SIZE, PLAYER_SIZE))
-
-        self.player2_image = pygame.image.load("assets/left_player_img.png").convert_alpha()
-        self.player2_image = pygame.transform.scale(self.player2_image, (PLAYER_SIZE, PLAYER_SIZE))
-
-        self.ball_image = pygame.image.load("assets/football.png").convert_alpha()
-        self.ball_image = pygame.transform.scale(self.ball_image, (BALL_SIZE*2, BALL_SIZE*2))
-
-
-    def __init__(self, render_mode=True):
-        pygame.init()
-        self.screen = pygame.display.set_mode((WIDTH, HEIGHT)) if render_mode else None
-        self.clock = pygame.time.Clock()
-        self.gk1 = pygame.Rect(10, HEIGHT // 2, PLAYER_SIZE, PLAYER_SIZE)  # Left goal
-        self.gk2 = pygame.Rect(WIDTH - 30, HEIGHT // 2, PLAYER_SIZE, PLAYER_SIZE)  # Right goal
-        if render_mode == True:
-            self.load_assets()
+    __slots__ = ("rng", "renderer", "screen", "render_mode", "p1", "p2", "ball", "gk1", "gk2",
+                 "ball_vel", "done", "possession", "stepcount")
+
+    def __init__(self, render_mode=True, seed=None, renderer=None):
+        # Private random stream so matches can be reproduced (and run in parallel)
+        self.rng = random.Random(seed)
+        # pygame is only loaded when there is something to draw; pass a renderer
+        # to draw offscreen, unthrottled or to image files
+        if renderer is not None:
+            render_mode = True
+        elif render_mode == True:
+            from render import PygameRenderer
+            renderer = PygameRenderer()
+        self.renderer = renderer
+        self.screen = renderer.screen if renderer is not None else None
+        self.gk1 = Rect(10, HEIGHT // 2, PLAYER_SIZE, PLAYER_SIZE)  # Left goal
+        self.gk2 = Rect(WIDTH - 30, HEIGHT // 2, PLAYER_SIZE, PLAYER_SIZE)  # Right goal
         self.render_mode = render_mode
+        self.stepcount = 0
         self.reset()
 
+    def seed(self, seed):
+        self.rng.seed(seed)
+
     def reset(self):
-        self.p1 = pygame.Rect(100, HEIGHT // 2, PLAYER_SIZE, PLAYER_SIZE)
-        self.p2 = pygame.Rect(WIDTH - 100, HEIGHT // 2, PLAYER_SIZE, PLAYER_SIZE)
-        self.ball = pygame.Rect(WIDTH // 2, HEIGHT // 2, BALL_SIZE, BALL_SIZE)
-        self.ball_vel = [random.randint(-1,1),0]
-        self.gk1 = pygame.Rect(10, HEIGHT // 2, PLAYER_SIZE, PLAYER_SIZE)  # Left goal
-        self.gk2 = pygame.Rect(WIDTH - 30, HEIGHT // 2, PLAYER_SIZE, PLAYER_SIZE)  # Right goal
+        self.p1 = Rect(100, HEIGHT // 2, PLAYER_SIZE, PLAYER_SIZE)
+        self.p2 = Rect(WIDTH - 100, HEIGHT // 2, PLAYER_SIZE, PLAYER_SIZE)
+        self.ball = Rect(WIDTH // 2, HEIGHT // 2, BALL_SIZE, BALL_SIZE)
+        self.ball_vel = [self.rng.randint(-1,1),0]
+        self.gk1 = Rect(10, HEIGHT // 2, PLAYER_SIZE, PLAYER_SIZE)  # Left goal
+        self.gk2 = Rect(WIDTH - 30, HEIGHT // 2, PLAYER_SIZE, PLAYER_SIZE)  # Right goal
         self.done = False
         self.possession = 0  # 0 = none, 1 = p1, 2 = p2
         return self.get_obs()
 
     def get_obs(self):
-        return np.array([
-            self.p1.x / WIDTH, self.p1.y / HEIGHT,
-            self.p2.x / WIDTH, self.p2.y / HEIGHT,
-            self.ball.x / WIDTH, self.ball.y / HEIGHT,
-            self.ball_vel[0] / BALL_SPEED, self.ball_vel[1] / BALL_SPEED,
-            self.possession / 2
-        ], dtype=np.float32)
+        obs = np.empty(OBS_SIZE, dtype=np.float32)
+        self.write_obs(obs)
+        return obs
+
+    # Writes the observation into out, a float32 array of 9 (or any writable buffer
+    # of 9 C floats). Same values as get_obs.
+    def write_obs(self, out):
+        p1, p2, ball, ball_vel = self.p1, self.p2, self.ball, self.ball_vel
+        _OBS.pack_into(out, 0,
+                       p1.x / WIDTH, p1.y / HEIGHT,
+                       p2.x / WIDTH, p2.y / HEIGHT,
+                       ball.x / WIDTH, ball.y / HEIGHT,
+                       ball_vel[0] / BALL_SPEED, ball_vel[1] / BALL_SPEED,
+                       self.possession / 2)
+
+    # Snapshot of the match as a STATE_SIZE int64 array, written into out when given
+    # (or any writable buffer of STATE_SIZE int64s). Restoring it with set_state,
+    # on this env or another, continues the match exactly, random draws included.
+    def get_state(self, out=None):
+        if out is None:
+            out = np.empty(STATE_SIZE, dtype=np.int64)
+        p1, p2, ball, gk1, gk2 = self.p1, self.p2, self.ball, self.gk1, self.gk2
+        _, mt, gauss = self.rng.getstate()
+        _STATE_HEADER.pack_into(out, 0,
+                                p1.x, p1.y, p2.x, p2.y, ball.x, ball.y, gk1.x, gk1.y, gk2.x, gk2.y,
+                                self.ball_vel[0], self.ball_vel[1], self.possession, self.done, self.stepcount,
+                                gauss is not None, _float_bits(gauss or 0.0))
+        _STATE_MT.pack_into(out, _STATE_HEADER.size, *mt)
+        return out
+
+    def set_state(self, state):
+        p1, p2, ball, gk1, gk2 = self.p1, self.p2, self.ball, self.gk1, self.gk2
+        (p1.x, p1.y, p2.x, p2.y, ball.x, ball.y, gk1.x, gk1.y, gk2.x, gk2.y,
+         self.ball_vel[0], self.ball_vel[1], self.possession, done, self.stepcount,
+         has_gauss, gauss) = _STATE_HEADER.unpack_from(state)
+        self.done = bool(done)
+        mt = _STATE_MT.unpack_from(state, _STATE_HEADER.size)
+        self.rng.setstate((_RNG_VERSION, mt, _bits_float(gauss) if has_gauss else None))
 
     def step1(self, action1, action2):
         self._move_player(self.p1, action1)
@@ -78,9 +128,20 @@ class SoccerEnv:
 
 
 
-    stepcount = 0
     def step(self, action1, action2):
-        old_dist = self._distance(self.p1.center, self.ball.center)
+        reward, scorer = self._advance(action1, action2)
+        return self.get_obs(), reward, self.done, scorer, {}
+
+    # Same as step, but the observation goes into the caller's obs_out buffer (see
+    # write_obs) instead of a new array, and only (reward, done, scorer) is returned
+    def step_into(self, action1, action2, obs_out):
+        reward, scorer = self._advance(action1, action2)
+        self.write_obs(obs_out)
+        return reward, self.done, scorer
+
+    # One physics step; returns (reward, scorer) and sets self.done
+    def _advance(self, action1, action2):
+        old_dist = self._ball_distance()
         scorer = 0
         #print(action1);
         self._move_player(self.p1, action1)
@@ -94,7 +155,7 @@ class SoccerEnv:
             reward += 0.01
 
         # Reward for moving closer to the ball
-        new_dist = self._distance(self.p1.center, self.ball.center)
+        new_dist = self._ball_distance()
         if new_dist < old_dist:
             reward += 0.02
         
@@ -105,7 +166,7 @@ class SoccerEnv:
         # Optional: detect kicking (if action1 == 4 and possession)
         if action1 == 4 and self.possession == 1:
            # print("kicking logic reached")
-            self.try_kick(self.p1, [1, 0])  # Kick right
+            self.try_kick(self.p1, KICK_RIGHT)  # Kick right
             # Add extra reward if near the opponent's goal
             if self.ball.x > WIDTH * 0.7:
                 reward += 0.23  # More incentive to kick near goal
@@ -114,7 +175,7 @@ class SoccerEnv:
 
         if action2 == 4 and self.possession == 2:
            # print("kicking logic reached")
-            self.try_kick(self.p2, [-1, 0])  # Kick right
+            self.try_kick(self.p2, KICK_LEFT)  # Kick left
             # Add extra reward if near the opponent's goal
 
         self._move_ball()
@@ -124,14 +185,14 @@ class SoccerEnv:
 
         # Check for own goal (ball crosses left boundary *and* is within goal height)
         if self.ball.left <= 0 and goal_top <= self.ball.y <= goal_bottom:
-            print("Own goal")
+            logger.debug("Own goal")
             scorer = 2
             reward -= 0.5
             self.done = True
 
         # Check for scoring (ball crosses right boundary *and* is within goal height)
         elif self.ball.right >= WIDTH and goal_top <= self.ball.y <= goal_bottom:
-            print("Scored a goal!")
+            logger.debug("Scored a goal!")
             scorer = 1
             reward += 2.0
             if action1 == 4:  # last action was a kick
@@ -147,17 +208,45 @@ class SoccerEnv:
         if self.render_mode:
             self.render()
 
-        return self.get_obs(), reward, self.done,scorer, {}
+        return reward, scorer
         
+    # Plays the same pair of actions for up to k physics steps, so agents only have to
+    # decide once per k ticks. Rewards are summed and a goal stops the repeat at once;
+    # info["steps"] says how many steps were actually played. With obs_out the
+    # observation is written into that buffer, as in step_into.
+    def step_repeat(self, action1, action2, k, obs_out=None):
+        if k < 1:
+            raise ValueError(f"step_repeat needs at least one step, got k={k}")
+        total_reward = 0.0
+        for i in range(k):
+            reward, scorer = self._advance(action1, action2)
+            total_reward += reward
+            if self.done:
+                break
+        if obs_out is None:
+            obs_out = self.get_obs()
+        else:
+            self.write_obs(obs_out)
+        return obs_out, total_reward, self.done, scorer, {"steps": i + 1}
+
     def _distance(self, a, b):
-        return np.sqrt((a[0] - b[0])**2 + (a[1] - b[1])**2)
+        return math.sqrt((a[0] - b[0])**2 + (a[1] - b[1])**2)
+
+    # _distance(p1.center, ball.center) without building the center tuples
+    def _ball_distance(self):
+        p1, ball = self.p1, self.ball
+        dx = (p1.x + p1.w // 2) - (ball.x + ball.w // 2)
+        dy = (p1.y + p1.h // 2) - (ball.y + ball.h // 2)
+        return math.sqrt(dx * dx + dy * dy)
 
     def try_kick(self, player, direction):
         if self.possession == 1 and player == self.p1:
-            self.ball_vel = [direction[0] * BALL_SPEED, direction[1] * BALL_SPEED]
+            self.ball_vel[0] = direction[0] * BALL_SPEED
+            self.ball_vel[1] = direction[1] * BALL_SPEED
             self.possession = 0
         elif self.possession == 2 and player == self.p2:
-            self.ball_vel = [direction[0] * BALL_SPEED, direction[1] * BALL_SPEED]
+            self.ball_vel[0] = direction[0] * BALL_SPEED
+            self.ball_vel[1] = direction[1] * BALL_SPEED
             self.possession = 0
 
     def _move_player(self, player, action):
@@ -194,13 +283,13 @@ class SoccerEnv:
         LOSS_PROBABILITY = 0.01  # 3% chance to lose possession randomly
 
         if self.possession == 1:
-            if not self.ball.colliderect(self.p1) or random.random() < LOSS_PROBABILITY:
+            if not self.ball.colliderect(self.p1) or self.rng.random() < LOSS_PROBABILITY:
                # print("possession 1 lost")
                 self.possession = 0
                 return
 
         elif self.possession == 2:
-            if not self.ball.colliderect(self.p2) or random.random() < LOSS_PROBABILITY:
+            if not self.ball.colliderect(self.p2) or self.rng.random() < LOSS_PROBABILITY:
                # print("possession 2 lost")
                 self.possession = 0
                 return
@@ -235,7 +324,7 @@ class SoccerEnv:
         # Both are in range
         if p1_close and p2_close:
           #  print("both close")
-            self.possession = random.choice([1, 2])
+            self.possession = self.rng.choice([1, 2])
             self.ball.center = self.p1.center if self.possession == 1 else self.p2.center
 
         elif p1_close:
@@ -258,16 +347,16 @@ class SoccerEnv:
         offset_range = 50  # pixels they might aim wrong
 
         # Goalkeeper 1
-        if random.random() < reaction_chance:
-            target_y1 = self.ball.centery + random.randint(-offset_range, offset_range)
+        if self.rng.random() < reaction_chance:
+            target_y1 = self.ball.centery + self.rng.randint(-offset_range, offset_range)
             if target_y1 < self.gk1.centery:
                 self.gk1.y -= PLAYER_SPEED
             elif target_y1 > self.gk1.centery:
                 self.gk1.y += PLAYER_SPEED
 
         # Goalkeeper 2
-        if random.random() < reaction_chance:
-            target_y2 = self.ball.centery + random.randint(-offset_range, offset_range)
+        if self.rng.random() < reaction_chance:
+            target_y2 = self.ball.centery + self.rng.randint(-offset_range, offset_range)
             if target_y2 < self.gk2.centery:
                 self.gk2.y -= PLAYER_SPEED
             elif target_y2 > self.gk2.centery:
@@ -286,14 +375,26 @@ class SoccerEnv:
       
 
     def render(self):
-        self.screen.blit(self.field_image, (0, 0))
-        pygame.draw.rect(self.screen, (255, 255, 255), (0, HEIGHT//2 - GOAL_WIDTH//2, 10, GOAL_WIDTH))
-        pygame.draw.rect(self.screen, (255, 255, 255), (WIDTH-10, HEIGHT//2 - GOAL_WIDTH//2, 10, GOAL_WIDTH))
-        self.screen.blit(self.player1_image, self.p1.topleft)
-        self.screen.blit(self.player2_image, self.p2.topleft)
-        self.screen.blit(self.ball_image, self.ball.topleft)
-        pygame.draw.rect(self.screen, (0, 15, 155), self.gk1)  # Blue for gk1
-        pygame.draw.rect(self.screen, (155, 15, 0), self.gk2)  # Red for gk2
-        pygame.display.flip()
-        self.clock.tick(60)
+        self.renderer.draw(self)
+
+
+_DOUBLE = struct.Struct("<d")
+_INT64 = struct.Struct("<q")
+
+
+def _float_bits(value):
+    return _INT64.unpack(_DOUBLE.pack(value))[0]
+
+
+def _bits_float(bits):
+    return _DOUBLE.unpack(_INT64.pack(bits))[0]
+
 
+# Phases timed when profiling is enabled
+profiler.instrument(SoccerEnv, "_advance", "env_step")
+profiler.instrument(SoccerEnv, "_move_player", "player_move")
+profiler.instrument(SoccerEnv, "_handle_possession", "possession")
+profiler.instrument(SoccerEnv, "try_kick", "kick")
+profiler.instrument(SoccerEnv, "_move_ball", "ball_move")
+profiler.instrument(SoccerEnv, "_move_goalkeepers", "goalkeepers")
+profiler.instrument(SoccerEnv, "render", "render")
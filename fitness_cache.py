@@ -0,0 +1,52 @@
+# fitness_cache.py
+# Remembers evaluation results so genomes that reach a generation unchanged
+# (elites) are not simulated again. Results are keyed by what fully determines
+# a deterministic evaluation: the network a genome expresses and the seeds of
+# the matches it plays.
+import hashlib
+
+
+# Canonical hash of the expressed network: enabled connections with their weights
+# and every node's parameters, in key order. Floats are hashed by repr, which is exact.
+def genome_hash(genome):
+    h = hashlib.sha1()
+    for key in sorted(genome.connections):
+        cg = genome.connections[key]
+        if cg.enabled:
+            h.update(repr((key, cg.weight)).encode())
+    h.update(b"|")
+    for key in sorted(genome.nodes):
+        ng = genome.nodes[key]
+        h.update(repr((key, ng.bias, ng.response, ng.activation, ng.aggregation)).encode())
+    return h.hexdigest()
+
+
+# Results from the current and the previous generation. Elites only ever come from
+# the previous generation, so anything older is dropped and memory stays bounded.
+class FitnessCache:
+
+    def __init__(self):
+        self.entries = {}
+        self.previous = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self.entries:
+            self.hits += 1
+            return self.entries[key]
+        if key in self.previous:
+            self.hits += 1
+            self.entries[key] = self.previous[key]
+            return self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, result):
+        self.entries[key] = result
+
+    def next_generation(self):
+        self.previous = self.entries
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
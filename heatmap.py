@@ -0,0 +1,191 @@
+# heatmap.py
+# Position heatmaps. HeatmapAccumulator keeps one fixed-size 2D histogram each
+# for player 1, player 2 and the ball and adds positions as they come in, so
+# memory and cost per step stay constant however long the match is. Images are
+# drawn on a standalone Agg figure: no display, no global pyplot state.
+#
+# Offline, heatmaps for every checkpoint are built in parallel from recorded
+# matches and written to heatmaps/:
+#
+#   python heatmap.py                          # every best_gen_gen*.pkl and winner.pkl
+#   python heatmap.py best_gen_gen10.rpl obs_log_gen1.npy --workers 4
+#
+# A checkpoint uses its replay (.rpl next to the .pkl) when there is one;
+# otherwise its evaluation matches are played headless and recorded first.
+# Trajectory logs (.npy) hold the observation before each step, which is enough
+# for all three heatmaps.
+import os
+import re
+import sys
+import glob
+import pickle
+import argparse
+import multiprocessing
+
+import numpy as np
+
+from env import WIDTH, HEIGHT, PLAYER_SIZE, BALL_SIZE
+
+BINS = (32, 24)  # x, y bins over the field
+OUTPUT_DIR = "heatmaps"
+CONFIG_PATH = "config-feedforward.txt"
+OBJECTS = ("p1", "p2", "ball")
+TITLES = {"p1": "Player 1", "p2": "Player 2", "ball": "Ball"}
+
+
+class HeatmapAccumulator:
+
+    def __init__(self, bins=BINS):
+        self.bins = bins
+        self.counts = {name: np.zeros(bins, dtype=np.int64) for name in OBJECTS}
+
+    # Bin of a position, clamped like np.histogram2d's closed last bin
+    def _bin(self, x, y):
+        bx, by = self.bins
+        return min(max(int(x * bx / WIDTH), 0), bx - 1), min(max(int(y * by / HEIGHT), 0), by - 1)
+
+    # Adds the centers of both players and the ball
+    def add(self, env):
+        counts = self.counts
+        counts["p1"][self._bin(*env.p1.center)] += 1
+        counts["p2"][self._bin(*env.p2.center)] += 1
+        counts["ball"][self._bin(*env.ball.center)] += 1
+
+    # Adds arrays of center coordinates for one object
+    def add_positions(self, name, xs, ys):
+        bx, by = self.bins
+        ix = np.clip((np.asarray(xs) * bx / WIDTH).astype(np.int64), 0, bx - 1)
+        iy = np.clip((np.asarray(ys) * by / HEIGHT).astype(np.int64), 0, by - 1)
+        self.counts[name] += np.bincount(ix * by + iy, minlength=bx * by).reshape(self.bins)
+
+    # Adds every step of a trajectory log (see trajectory.py)
+    def add_trajectory(self, trajectory):
+        obs = np.asarray(trajectory["obs"], dtype=np.float64)
+        for name, col, size in (("p1", 0, PLAYER_SIZE), ("p2", 2, PLAYER_SIZE), ("ball", 4, BALL_SIZE)):
+            xs = np.rint(obs[:, col] * WIDTH) + size // 2
+            ys = np.rint(obs[:, col + 1] * HEIGHT) + size // 2
+            self.add_positions(name, xs, ys)
+
+    def merge(self, other):
+        for name in OBJECTS:
+            self.counts[name] += other.counts[name]
+
+    def save(self, path, title):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        fig = Figure(figsize=(15, 4))
+        FigureCanvasAgg(fig)
+        for i, name in enumerate(OBJECTS):
+            ax = fig.add_subplot(1, len(OBJECTS), i + 1)
+            image = ax.imshow(self.counts[name].T, origin='lower', cmap='magma', interpolation='nearest',
+                              extent=[0, WIDTH, 0, HEIGHT])
+            fig.colorbar(image, ax=ax, label='Visit Frequency')
+            ax.set_title(f"{TITLES[name]} Heatmap - {title}")
+            ax.set_xlabel("X Position")
+            ax.set_ylabel("Y Position")
+        fig.tight_layout()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fig.savefig(path)
+
+
+def heatmap_from_replay(replay):
+    from replay import ReplayEngine
+    engine = ReplayEngine(replay)
+    heatmap = HeatmapAccumulator()
+    for _ in engine.frames(1):
+        heatmap.add(engine.env)
+    return heatmap
+
+
+# Plays a checkpoint's evaluation matches headless and records them
+def record_checkpoint(path, config_path=CONFIG_PATH):
+    import neat
+    import train_neat
+    from env import SoccerEnv
+    from replay import ReplayRecorder
+    from checkpoint import run_setting, CHECKPOINT_PATH
+
+    config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                         neat.DefaultStagnation, config_path)
+    with open(path, "rb") as f:
+        genome = pickle.load(f)
+    # Matches as the run played them
+    train_neat.SEED = run_setting("seed", train_neat.SEED, CHECKPOINT_PATH)
+    train_neat.DECISION_INTERVAL = run_setting("decision_interval", train_neat.DECISION_INTERVAL, CHECKPOINT_PATH)
+    recorder = ReplayRecorder(train_neat.genome_seed(genome))
+    train_neat.play_genome(genome, config, SoccerEnv(render_mode=False), recorder=recorder)
+    return recorder.replay
+
+
+def build_heatmap(path):
+    from replay import Replay
+    from trajectory import load_trajectory
+
+    base, ext = os.path.splitext(path)
+    if ext == ".npy":
+        heatmap = HeatmapAccumulator()
+        heatmap.add_trajectory(load_trajectory(path))
+        return heatmap
+    if ext == ".pkl" and os.path.exists(base + ".rpl"):
+        path, ext = base + ".rpl", ".rpl"
+    replay = Replay.load(path) if ext == ".rpl" else record_checkpoint(path)
+    return heatmap_from_replay(replay)
+
+
+# "best_gen_gen10.pkl" -> "Generation 10", anything else by its name
+def heatmap_title(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    match = re.fullmatch(r"best_gen_gen(\d+)", name)
+    return f"Generation {match.group(1)}" if match else name
+
+
+# Image of a checkpoint, replay or trajectory: heatmap_<name>.png, here and in agent_test
+def heatmap_path(path, output_dir=OUTPUT_DIR):
+    return os.path.join(output_dir, f"heatmap_{os.path.splitext(os.path.basename(path))[0]}.png")
+
+
+def _render(job):
+    path, output_dir = job
+    output = heatmap_path(path, output_dir)
+    build_heatmap(path).save(output, heatmap_title(path))
+    return output
+
+
+def generate(paths, output_dir=OUTPUT_DIR, workers=None):
+    jobs = [(path, output_dir) for path in paths]
+    if workers == 1 or len(jobs) <= 1:
+        return [_render(job) for job in jobs]
+    with multiprocessing.Pool(workers) as pool:
+        return pool.map(_render, jobs)
+
+
+def checkpoints():
+    files = glob.glob("best_gen_gen*.pkl")
+    files.sort(key=lambda f: int(re.findall(r'\d+', f)[0]))
+    if os.path.exists("winner.pkl"):
+        files.append("winner.pkl")
+    return files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Draw position heatmaps from checkpoints, replays or trajectories")
+    parser.add_argument("paths", nargs="*", help=".pkl checkpoints, .rpl replays or .npy trajectories "
+                                                 "(default: every checkpoint)")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="directory for the images")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    paths = args.paths or checkpoints()
+    if not paths:
+        print("Nothing to draw")
+        return 1
+    for output in generate(paths, args.output, args.workers):
+        print(f"Heatmap saved: {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
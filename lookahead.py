@@ -0,0 +1,139 @@
+# lookahead.py
+# Shallow-search opponent. Before every move it copies the match into a private
+# headless SoccerEnv (get_state / set_state) and tries each of its actions,
+# followed by each of its actions again, holding both for `hold` steps, with the
+# other player modelled by chase_action. Leaves are scored by goals, possession,
+# how far the ball is up the field and how close the player is to it. The hold
+# doubles (iterative deepening) while the move's time budget lasts and the
+# deepest finished search picks the move.
+#
+#   python tournament.py --lookahead                      # against the scripted opponents
+#   python tournament.py --lookahead --lookahead-budget 5 winner.pkl
+#
+# The search does not see the match's real dice: the copy's random stream is
+# reseeded every move, so the possession losses and goalkeeper moves it plays
+# through are plausible ones, not the ones about to happen. How many depths fit
+# in the budget depends on the machine; a budget that always reaches the last
+# of HOLDS makes the moves reproducible.
+import math
+import time
+
+import numpy as np
+
+from env import SoccerEnv, OBS_SIZE, STATE_SIZE, WIDTH, HEIGHT
+
+TIME_BUDGET = 0.002  # seconds per move
+HOLDS = (1, 2, 4, 8, 16)  # steps each action is held, one search depth each
+N_ACTIONS = 5
+GOAL_VALUE = 10.0  # minus GOAL_DELAY per step it takes
+GOAL_DELAY = 0.01
+POSSESSION_VALUE = 0.5
+DISTANCE_WEIGHT = 0.5
+
+
+def _direction(src, dst):
+    dx = dst[0] - src[0]
+    dy = dst[1] - src[1]
+    if abs(dx) > abs(dy):
+        return 3 if dx > 0 else 2  # right or left
+    return 1 if dy > 0 else 0  # down or up
+
+
+# get_agent2_action for either side: carry the ball to the goal height and kick,
+# chase the opponent when it has the ball, the ball otherwise
+def chase_action(env, side):
+    me, other = (env.p2, env.p1) if side == 2 else (env.p1, env.p2)
+    if env.possession == side:
+        if abs(me.centery - HEIGHT // 2) < 40:
+            return 4
+        return _direction(me.center, (0 if side == 2 else WIDTH, HEIGHT // 2))
+    if env.possession:
+        return _direction(me.center, other.center)
+    return _direction(me.center, env.ball.center)
+
+
+# How good a position is for side, without goals
+def evaluate(env, side):
+    ball = env.ball
+    me = env.p2 if side == 2 else env.p1
+    value = (WIDTH - ball.centerx) / WIDTH if side == 2 else ball.centerx / WIDTH
+    if env.possession == side:
+        value += POSSESSION_VALUE
+    elif env.possession:
+        value -= POSSESSION_VALUE
+    else:
+        dx = me.centerx - ball.centerx
+        dy = me.centery - ball.centery
+        value -= DISTANCE_WEIGHT * math.sqrt(dx * dx + dy * dy) / WIDTH
+    return value
+
+
+class LookaheadAgent:
+
+    def __init__(self, budget=TIME_BUDGET, holds=HOLDS, seed=0):
+        self.budget = budget
+        self.holds = holds
+        self.seed = seed
+        self.sim = SoccerEnv(render_mode=False)
+        self.root = np.empty(STATE_SIZE, dtype=np.int64)
+        self.branch = np.empty(STATE_SIZE, dtype=np.int64)
+        self.obs = np.empty(OBS_SIZE, dtype=np.float32)
+        self.depths = []  # hold of the deepest finished search of every move
+
+    # Player 2 policy, called like get_agent2_action
+    def __call__(self, env):
+        return self.act(env, 2)
+
+    def act(self, env, side):
+        deadline = time.perf_counter() + self.budget
+        sim = self.sim
+        sim.set_state(env.get_state(self.root))
+        sim.seed(self.seed * 1000003 + env.stepcount)
+        sim.get_state(self.root)
+
+        best = chase_action(env, side)  # if not even the shallowest search finishes
+        depth = 0
+        for hold in self.holds:
+            values = self._search(side, hold, deadline)
+            if values is None:
+                break
+            best = values.index(max(values))
+            depth = hold
+        self.depths.append(depth)
+        return best
+
+    # Value of each first action at this hold, or None when the deadline passed
+    def _search(self, side, hold, deadline):
+        sim = self.sim
+        values = []
+        for first in range(N_ACTIONS):
+            if time.perf_counter() > deadline:
+                return None
+            sim.set_state(self.root)
+            goal = self._play(side, first, hold, 0)
+            if goal is not None:
+                values.append(goal)
+                continue
+            sim.get_state(self.branch)
+            value = -math.inf
+            for second in range(N_ACTIONS):
+                if time.perf_counter() > deadline:
+                    return None
+                if second:
+                    sim.set_state(self.branch)
+                goal = self._play(side, second, hold, hold)
+                value = max(value, evaluate(sim, side) if goal is None else goal)
+            values.append(value)
+        return values
+
+    # Holds action for `hold` steps on the copy; the goal's value if one was scored
+    def _play(self, side, action, hold, played):
+        sim = self.sim
+        for step in range(hold):
+            other = chase_action(sim, 3 - side)
+            a1, a2 = (other, action) if side == 2 else (action, other)
+            _, done, scorer = sim.step_into(a1, a2, self.obs)
+            if done:
+                value = GOAL_VALUE - GOAL_DELAY * (played + step)
+                return value if scorer == side else -value
+        return None
@@ -0,0 +1,186 @@
+# metrics.py
+# Live training metrics. run_neat hands one record per generation to a
+# MetricsPublisher; a background thread appends it to a JSON-lines log and, when
+# a port is given, serves all records over HTTP on localhost. publish() only puts
+# the record on a queue, so slow disks or clients never hold up evaluation.
+#
+#   python train_neat.py --metrics-port 8765
+#   python metrics.py view                          # poll the running training
+#   python metrics.py plot metrics_<timestamp>.jsonl -o fitness.png
+#
+# GET /metrics?since=N returns {"records": [...]} with the records of generations
+# after N.
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+
+HOST = "127.0.0.1"
+PORT = 8765
+POLL_INTERVAL = 2.0
+# ranking_reliability and episode_equivalent are null when a generation can't tell (see train_neat.ranking_precision)
+FIELDS = ("generation", "max_fitness", "mean_fitness", "goal_ratio", "species", "eval_time", "steps_per_sec",
+          "ranking_reliability", "episode_equivalent")
+
+
+class MetricsPublisher:
+
+    # With offset set (from a checkpoint) the log is cut back to that length first
+    def __init__(self, path, port=None, host=HOST, offset=None):
+        self.path = path
+        if offset is not None and os.path.exists(path):
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+        self.records = []
+        if os.path.exists(path):
+            with open(path) as f:
+                self.records = [json.loads(line) for line in f if line.strip()]
+        self.file = open(path, "a")
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        threading.Thread(target=self._write, daemon=True).start()
+
+        self.server = None
+        if port is not None:
+            from http.server import ThreadingHTTPServer  # only loaded when serving
+            self.server = ThreadingHTTPServer((host, port), _handler(self))
+            self.server.daemon_threads = True
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def publish(self, record):
+        self.queue.put(record)
+
+    def _write(self):
+        while True:
+            record = self.queue.get()
+            try:
+                self.file.write(json.dumps(record) + "\n")
+                self.file.flush()
+                with self.lock:
+                    self.records.append(record)
+            finally:
+                self.queue.task_done()
+
+    def since(self, generation):
+        with self.lock:
+            return [record for record in self.records if record["generation"] > generation]
+
+    # Length of the log once everything published so far is written
+    def offset(self):
+        self.queue.join()
+        return self.file.tell()
+
+    def close(self):
+        self.queue.join()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        self.file.close()
+
+
+def _handler(publisher):
+    from http.server import BaseHTTPRequestHandler
+    from urllib.parse import urlparse, parse_qs
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            since = int(parse_qs(url.query).get("since", ["0"])[0])
+            body = json.dumps({"records": publisher.since(since)}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # no request log on the training output
+
+    return Handler
+
+
+def _row(record):
+    return (f"{record['generation']:5d} {record['max_fitness']:10.4f} {record['mean_fitness']:10.4f} "
+            f"{record['goal_ratio']:8.3f} {record['species']:8d} {record['eval_time']:8.2f} "
+            f"{record['steps_per_sec']:10.0f}")
+
+
+# Prints new generations as the training publishes them, until interrupted
+def view(url, interval=POLL_INTERVAL):
+    import urllib.request
+    print(f"{'gen':>5s} {'max':>10s} {'mean':>10s} {'goals':>8s} {'species':>8s} {'eval_s':>8s} {'steps/s':>10s}")
+    last = 0
+    while True:
+        try:
+            with urllib.request.urlopen(f"{url}/metrics?since={last}", timeout=interval) as response:
+                records = json.load(response)["records"]
+        except OSError as e:
+            print(f"Waiting for {url} ({e})")
+            records = []
+        for record in records:
+            print(_row(record))
+            last = record["generation"]
+        time.sleep(interval)
+
+
+def load_records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def plot(path, output, threshold=None):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    records = load_records(path)
+    generations = [r["generation"] for r in records]
+    fig, (fitness_ax, speed_ax) = plt.subplots(2, 1, figsize=(10, 7), sharex=True)
+    fitness_ax.plot(generations, [r["max_fitness"] for r in records], label="Max Fitness per Generation")
+    fitness_ax.plot(generations, [r["mean_fitness"] for r in records], label="Mean Fitness per Generation")
+    if threshold is not None:
+        fitness_ax.axhline(y=threshold, color='r', linestyle='--', label='Fitness Threshold')
+    fitness_ax.set_ylabel("Fitness")
+    fitness_ax.set_title("Fitness Progression Over Generations")
+    fitness_ax.legend()
+    fitness_ax.grid(True)
+    speed_ax.plot(generations, [r["steps_per_sec"] for r in records], color="g")
+    speed_ax.set_xlabel("Generation")
+    speed_ax.set_ylabel("Env steps/s")
+    speed_ax.grid(True)
+    fig.tight_layout()
+    fig.savefig(output)
+    print(f"✔ Plot saved to {output}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch or plot training metrics")
+    commands = parser.add_subparsers(dest="command", required=True)
+    view_parser = commands.add_parser("view", help="poll a running training")
+    view_parser.add_argument("--url", default=f"http://{HOST}:{PORT}")
+    view_parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="seconds between polls")
+    plot_parser = commands.add_parser("plot", help="plot a metrics log")
+    plot_parser.add_argument("log", help="metrics_<timestamp>.jsonl written by the training")
+    plot_parser.add_argument("-o", "--output", help="image to write (default: the log name with .png)")
+    plot_parser.add_argument("--threshold", type=float, help="draw the config's fitness_threshold")
+    args = parser.parse_args(argv)
+
+    if args.command == "view":
+        try:
+            view(args.url, args.interval)
+        except KeyboardInterrupt:
+            pass
+    else:
+        plot(args.log, args.output or os.path.splitext(args.log)[0] + ".png", args.threshold)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+# physics.py
+# Dependency-free stand-in for the parts of pygame.Rect the simulation uses.
+# Coordinates are ints and every property follows pygame's rules (center uses
+# floor division, colliderect treats touching edges as not colliding), so the
+# headless env moves exactly like it did on pygame.Rect.
+
+
+class Rect:
+    __slots__ = ("x", "y", "w", "h")
+
+    def __init__(self, x, y, w, h):
+        self.x = x
+        self.y = y
+        self.w = w
+        self.h = h
+
+    @property
+    def left(self):
+        return self.x
+
+    @property
+    def top(self):
+        return self.y
+
+    @property
+    def right(self):
+        return self.x + self.w
+
+    @property
+    def bottom(self):
+        return self.y + self.h
+
+    @property
+    def width(self):
+        return self.w
+
+    @property
+    def height(self):
+        return self.h
+
+    @property
+    def centerx(self):
+        return self.x + self.w // 2
+
+    @property
+    def centery(self):
+        return self.y + self.h // 2
+
+    @property
+    def center(self):
+        return (self.x + self.w // 2, self.y + self.h // 2)
+
+    @center.setter
+    def center(self, pos):
+        self.x = pos[0] - self.w // 2
+        self.y = pos[1] - self.h // 2
+
+    @property
+    def topleft(self):
+        return (self.x, self.y)
+
+    # Strict overlap test, same as pygame for rects with a positive size
+    def colliderect(self, other):
+        return (self.x < other.x + other.w and self.y < other.y + other.h
+                and self.x + self.w > other.x and self.y + self.h > other.y)
+
+    def copy(self):
+        return Rect(self.x, self.y, self.w, self.h)
+
+    # Rects compare by value like pygame's, so env code such as `player == self.p1` keeps working
+    def __eq__(self, other):
+        if not isinstance(other, Rect):
+            return NotImplemented
+        return self.x == other.x and self.y == other.y and self.w == other.w and self.h == other.h
+
+    __hash__ = None
+
+    # Lets pygame drawing calls take a Rect wherever they accept an (x, y, w, h) sequence
+    def __iter__(self):
+        return iter((self.x, self.y, self.w, self.h))
+
+    def __len__(self):
+        return 4
+
+    def __getitem__(self, i):
+        return (self.x, self.y, self.w, self.h)[i]
+
+    def __repr__(self):
+        return f"Rect({self.x}, {self.y}, {self.w}, {self.h})"
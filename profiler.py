@@ -0,0 +1,95 @@
+# profiler.py
+# Per-phase timers and call counters for the simulation and evaluation hot paths.
+# Nothing in the hot path checks whether profiling is on: enable() swaps timing
+# wrappers in for the instrumented functions and disable() puts the originals
+# back, so a disabled profiler costs nothing. Timings are inclusive (the ball
+# move done while dribbling also counts towards possession handling).
+import time
+import logging
+import functools
+
+logger = logging.getLogger("profiler")
+
+
+class Profiler:
+
+    def __init__(self):
+        self.enabled = False
+        self.times = {}
+        self.counts = {}
+        self._targets = []  # (owner, attribute, phase) to wrap while enabled
+        self._originals = []
+
+    # Registers owner.attr (a method on a class or a function in a module) as a phase
+    def instrument(self, owner, attr, phase):
+        self._targets.append((owner, attr, phase))
+        if self.enabled:
+            self._wrap(owner, attr, phase)
+
+    def _wrap(self, owner, attr, phase):
+        original = owner.__dict__[attr] if isinstance(owner, type) else getattr(owner, attr)
+        times = self.times
+        counts = self.counts
+        times.setdefault(phase, 0.0)
+        counts.setdefault(phase, 0)
+        perf_counter = time.perf_counter
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                times[phase] += perf_counter() - start
+                counts[phase] += 1
+
+        setattr(owner, attr, timed)
+        self._originals.append((owner, attr, original))
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        for owner, attr, phase in self._targets:
+            self._wrap(owner, attr, phase)
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        for owner, attr, original in reversed(self._originals):
+            setattr(owner, attr, original)
+        self._originals = []
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def reset(self):
+        for phase in self.times:
+            self.times[phase] = 0.0
+        for name in self.counts:
+            self.counts[name] = 0
+
+    # Returns the collected stats and clears them (used to ship stats out of worker processes)
+    def take(self):
+        stats = {"times": dict(self.times), "counts": dict(self.counts)}
+        self.reset()
+        return stats
+
+    def merge(self, stats):
+        for phase, t in stats["times"].items():
+            self.times[phase] = self.times.get(phase, 0.0) + t
+        for name, n in stats["counts"].items():
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def report(self, title):
+        logger.info("Profile %s:", title)
+        for phase in sorted(self.times, key=self.times.get, reverse=True):
+            n = self.counts.get(phase, 0)
+            per_call = self.times[phase] / n * 1e6 if n else 0.0
+            logger.info("  %-16s %9.3f s %10d calls %9.2f us/call", phase, self.times[phase], n, per_call)
+        for name in sorted(set(self.counts) - set(self.times)):
+            logger.info("  %-16s %10d", name, self.counts[name])
+
+
+profiler = Profiler()
@@ -0,0 +1,124 @@
+# render.py
+# Pygame view of a SoccerEnv. Only created when the env runs with render_mode=True,
+# so headless training never imports pygame.
+#
+# The field and goals never change, so they are composited into one background
+# surface when the renderer starts. Each frame only restores the background under
+# last frame's sprites and draws the sprites again (dirty rects) instead of
+# reblitting the whole field. With offscreen=True the renderer runs on SDL's dummy
+# video driver, so it works on machines without a display, and with fps=0 frames
+# are produced as fast as possible, e.g. to export an image sequence.
+import os
+
+from env import WIDTH, HEIGHT, PLAYER_SIZE, BALL_SIZE, GOAL_WIDTH
+
+# Fonts are slow to create, keep one per size. They belong to the pygame session
+# that made them, so pygame.quit() empties the cache (agent_test quits when a
+# window is closed and starts pygame again for the next genome).
+_fonts = {}
+
+
+def get_font(size):
+    import pygame
+    if not _fonts:
+        pygame.register_quit(_fonts.clear)
+    if not pygame.font.get_init():
+        pygame.font.init()
+    if size not in _fonts:
+        _fonts[size] = pygame.font.SysFont("Arial", size)
+    return _fonts[size]
+
+
+class PygameRenderer:
+
+    def __init__(self, fps=60, offscreen=False, frame_skip=1, frame_dir=None, frame_format="png"):
+        if offscreen:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+        import pygame
+        self.pygame = pygame
+        pygame.init()
+        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        self.clock = pygame.time.Clock()
+        self.fps = fps  # 0 = unthrottled
+        self.offscreen = offscreen
+        self.frame_skip = frame_skip  # draw every frame_skip-th env step
+        self.frame_dir = frame_dir  # when set, every drawn frame is saved there
+        self.frame_format = frame_format  # png, or bmp/tga which are much faster to write
+        if frame_dir:
+            os.makedirs(frame_dir, exist_ok=True)
+        self.steps = 0
+        self.frames_drawn = 0
+        self.dirty = []  # screen areas to restore from the background next frame
+        self.full_redraw = True
+        self.load_assets()
+
+    def load_assets(self):
+        pygame = self.pygame
+        self.field_image = pygame.image.load("assets/field.png").convert_alpha()
+        self.field_image = pygame.transform.scale(self.field_image, (WIDTH, HEIGHT))
+
+        self.player1_image = pygame.image.load("assets/right_player_img.png").convert_alpha()
+        self.player1_image = pygame.transform.scale(self.player1_image, (PLAYER_SIZE, PLAYER_SIZE))
+
+        self.player2_image = pygame.image.load("assets/left_player_img.png").convert_alpha()
+        self.player2_image = pygame.transform.scale(self.player2_image, (PLAYER_SIZE, PLAYER_SIZE))
+
+        self.ball_image = pygame.image.load("assets/football.png").convert_alpha()
+        self.ball_image = pygame.transform.scale(self.ball_image, (BALL_SIZE*2, BALL_SIZE*2))
+
+        # Static part of every frame
+        self.background = pygame.Surface((WIDTH, HEIGHT)).convert()
+        self.background.blit(self.field_image, (0, 0))
+        pygame.draw.rect(self.background, (255, 255, 255), (0, HEIGHT//2 - GOAL_WIDTH//2, 10, GOAL_WIDTH))
+        pygame.draw.rect(self.background, (255, 255, 255), (WIDTH-10, HEIGHT//2 - GOAL_WIDTH//2, 10, GOAL_WIDTH))
+
+    def draw(self, env):
+        self.steps += 1
+        if (self.steps - 1) % self.frame_skip:
+            return
+        pygame = self.pygame
+        screen = self.screen
+
+        if self.full_redraw:
+            screen.blit(self.background, (0, 0))
+        else:
+            for rect in self.dirty:
+                screen.blit(self.background, rect, rect)
+        previous = self.dirty
+
+        players = getattr(env, "players", None)  # team_env.TeamSoccerEnv
+        if players is None:
+            self.dirty = [
+                screen.blit(self.player1_image, env.p1.topleft),
+                screen.blit(self.player2_image, env.p2.topleft),
+            ]
+        else:
+            self.dirty = [screen.blit(self.player1_image if i < env.team_size else self.player2_image, p.topleft)
+                          for i, p in enumerate(players)]
+        self.dirty += [
+            screen.blit(self.ball_image, env.ball.topleft),
+            pygame.draw.rect(screen, (0, 15, 155), tuple(env.gk1)),  # Blue for gk1
+            pygame.draw.rect(screen, (155, 15, 0), tuple(env.gk2)),  # Red for gk2
+        ]
+
+        if not self.offscreen:
+            if self.full_redraw:
+                pygame.display.flip()
+            else:
+                pygame.display.update(previous + self.dirty)
+        self.full_redraw = False
+
+        if self.frame_dir:
+            pygame.image.save(screen, os.path.join(self.frame_dir, f"frame_{self.frames_drawn:06d}.{self.frame_format}"))
+        self.frames_drawn += 1
+        if self.fps:
+            self.clock.tick(self.fps)
+
+    # Draws text over the current frame; its area is restored with the sprites next frame
+    def draw_text(self, text, x, y, size=24, color=(255, 255, 255)):
+        surface = get_font(size).render(text, True, color)
+        self.dirty.append(self.screen.blit(surface, (x, y)))
+
+    # Forces the next frame to repaint everything, e.g. after drawing over the screen directly
+    def invalidate(self):
+        self.full_redraw = True
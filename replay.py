@@ -0,0 +1,243 @@
+# replay.py
+# Compact match replays. The env is deterministic given its seed, so a match is
+# stored as that seed plus the action stream: one byte per step (a1 * 5 + a2) and
+# the length of each episode. Matches played on common random numbers
+# (train_neat.py --crn) also store their scenarios, since each episode then starts
+# from its own seed, and a flag says whether the genome's fitness also came from
+# self-play games, which are not part of the replay. ReplayEngine rebuilds any frame through a headless
+# SoccerEnv and keeps periodic state keyframes (SoccerEnv.get_state vectors) so
+# seeking does not have to re-simulate from the start.
+#
+#   python replay.py best_gen_gen10.rpl            # summary stats
+#   python replay.py best_gen_gen10.rpl --render   # watch it (use --fps 0 for max speed)
+#   python replay.py best_gen_gen10.rpl --export frames/ --frame-skip 2   # image sequence, no display needed
+import sys
+import struct
+import argparse
+
+from env import SoccerEnv
+
+MAGIC = b"SRPL"
+VERSION = 2
+HEADER = struct.Struct("<4sBQI")  # magic, version, seed, episode count
+EXTRA = struct.Struct("<BQB")  # since version 2: scenario mode (0 = none), scenario base, self-play flag
+SCENARIO_MODES = ("common", "antithetic", "stratified")
+N_ACTIONS = 5
+KEYFRAME_INTERVAL = 100
+
+
+# How every recorded match starts; replays must begin the same way
+def start_match(env, seed):
+    env.seed(seed)
+    env.stepcount = 0
+
+
+# How each episode of a match starts: a reset, or with scenarios = (mode,
+# base) a scenario shared by every genome of a generation. Episode e reseeds the
+# env from base; "antithetic" plays each seed twice, the second time with the
+# kickoff's ball direction reversed, and "stratified" spreads the kickoff
+# directions (-1, 0, 1) evenly over the episodes.
+def start_episode(env, episode, scenarios=None):
+    if scenarios is None:
+        env.reset()
+        return
+    mode, base = scenarios
+    start_match(env, base * 1009 + (episode // 2 if mode == "antithetic" else episode))
+    env.reset()
+    if mode == "antithetic" and episode % 2:
+        env.ball_vel[0] = -env.ball_vel[0]
+    elif mode == "stratified":
+        env.ball_vel[0] = (-1, 0, 1)[(base + episode) % 3]
+
+
+class Replay:
+
+    def __init__(self, seed, episode_lengths=None, actions=None, scenarios=None, selfplay=False):
+        self.seed = seed
+        self.episode_lengths = list(episode_lengths or [])
+        self.actions = bytearray(actions or b"")
+        self.scenarios = scenarios  # (mode, base) or None, see start_episode
+        self.selfplay = selfplay  # the fitness also included self-play games
+
+    @property
+    def n_steps(self):
+        return len(self.actions)
+
+    def action(self, frame):
+        return divmod(self.actions[frame], N_ACTIONS)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, len(self.episode_lengths)))
+            mode, base = self.scenarios or (None, 0)
+            f.write(EXTRA.pack(0 if mode is None else SCENARIO_MODES.index(mode) + 1, base, self.selfplay))
+            f.write(struct.pack(f"<{len(self.episode_lengths)}I", *self.episode_lengths))
+            f.write(self.actions)
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, seed, n_episodes = HEADER.unpack_from(data)
+        if magic != MAGIC or version not in (1, VERSION):
+            raise ValueError(f"{path} is not a version 1-{VERSION} replay file")
+        offset = HEADER.size
+        scenarios, selfplay = None, False
+        if version >= 2:
+            mode, base, selfplay = EXTRA.unpack_from(data, offset)
+            offset += EXTRA.size
+            scenarios = (SCENARIO_MODES[mode - 1], base) if mode else None
+        lengths = struct.unpack_from(f"<{n_episodes}I", data, offset)
+        offset += 4 * n_episodes
+        replay = Replay(seed, lengths, data[offset:], scenarios, bool(selfplay))
+        if sum(lengths) != replay.n_steps:
+            raise ValueError(f"{path} is truncated")
+        return replay
+
+
+# Collects a match as it is played: call record after every env.step and
+# end_episode whenever the env is about to be reset
+class ReplayRecorder:
+
+    def __init__(self, seed, scenarios=None):
+        self.replay = Replay(seed, scenarios=scenarios)
+        self._steps = 0
+
+    def record(self, action1, action2):
+        self.replay.actions.append(int(action1) * N_ACTIONS + int(action2))
+        self._steps += 1
+
+    def end_episode(self):
+        self.replay.episode_lengths.append(self._steps)
+        self._steps = 0
+
+
+class ReplayEngine:
+
+    def __init__(self, replay, keyframe_interval=KEYFRAME_INTERVAL, env=None):
+        self.replay = replay
+        self.keyframe_interval = keyframe_interval
+        self.env = env if env is not None else SoccerEnv(render_mode=False)
+        self.episode_ends = []
+        end = 0
+        for length in replay.episode_lengths:
+            end += length
+            self.episode_ends.append(end)
+
+        # One pass over the whole match to lay down keyframes and per-step results
+        self.rewards = [0.0] * replay.n_steps
+        self.scorers = [0] * replay.n_steps
+        self.possession = [0] * replay.n_steps
+        self.keyframes = []
+        self._begin()
+        while True:
+            if self.frame % keyframe_interval == 0:
+                self.keyframes.append(self._snapshot())
+            if self.frame >= replay.n_steps:
+                break
+            frame = self.frame
+            self.rewards[frame], self.scorers[frame] = self.step()
+            self.possession[frame] = self.env.possession
+        self.seek(0)
+
+    @property
+    def n_frames(self):
+        return self.replay.n_steps + 1
+
+    # Frame 0 is the first reset; frame f is the state after f steps. A frame that
+    # ends an episode shows its final state, the reset happens on the next step.
+    def _begin(self):
+        start_match(self.env, self.replay.seed)
+        start_episode(self.env, 0, self.replay.scenarios)
+        self.frame = 0
+        self.episode = 0
+
+    def step(self):
+        if self.frame >= self.replay.n_steps:
+            raise IndexError("End of replay")
+        while self.frame == self.episode_ends[self.episode]:
+            self.episode += 1
+            start_episode(self.env, self.episode, self.replay.scenarios)
+        a1, a2 = self.replay.action(self.frame)
+        _, reward, _, scorer, _ = self.env.step(a1, a2)
+        self.frame += 1
+        return reward, scorer
+
+    def seek(self, frame):
+        if not 0 <= frame < self.n_frames:
+            raise IndexError(f"Frame {frame} out of range (0-{self.n_frames - 1})")
+        keyframe = self.keyframes[frame // self.keyframe_interval]
+        # Jump to the keyframe unless stepping on from the current frame is shorter
+        if not keyframe[0] <= self.frame <= frame:
+            self._restore(keyframe)
+        while self.frame < frame:
+            self.step()
+
+    # Steps through frames start..end, yielding each frame index with the env positioned on it
+    def frames(self, start=0, end=None):
+        end = self.n_frames if end is None else end
+        self.seek(start)
+        yield self.frame
+        while self.frame + 1 < end:
+            self.step()
+            yield self.frame
+
+    def _snapshot(self):
+        return self.frame, self.episode, self.env.get_state()
+
+    def _restore(self, snapshot):
+        self.frame, self.episode, state = snapshot
+        self.env.set_state(state)
+
+    def stats(self):
+        steps = self.replay.n_steps
+        return {
+            "seed": self.replay.seed,
+            "scenarios": self.replay.scenarios,
+            "selfplay": self.replay.selfplay,
+            "episodes": len(self.replay.episode_lengths),
+            "steps": steps,
+            "goals_scored": self.scorers.count(1),
+            "goals_conceded": self.scorers.count(2),
+            "total_reward": sum(self.rewards),
+            "p1_possession": self.possession.count(1) / steps if steps else 0.0,
+            "p2_possession": self.possession.count(2) / steps if steps else 0.0,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or watch a recorded match")
+    parser.add_argument("replay", help="replay file (.rpl)")
+    parser.add_argument("--render", action="store_true", help="draw the match with pygame")
+    parser.add_argument("--fps", type=int, default=60, help="render frame rate, 0 = unthrottled")
+    parser.add_argument("--start", type=int, default=0, help="first frame to show")
+    parser.add_argument("--end", type=int, default=None, help="stop before this frame")
+    parser.add_argument("--export", metavar="DIR", help="render offscreen at full speed and save frames as PNGs")
+    parser.add_argument("--frame-skip", type=int, default=1, help="draw every n-th frame")
+    parser.add_argument("--format", default="png", choices=["png", "bmp", "tga"], help="exported image format")
+    args = parser.parse_args(argv)
+
+    replay = Replay.load(args.replay)
+    engine = ReplayEngine(replay)
+    for key, value in engine.stats().items():
+        print(f"{key:15s} {value}")
+
+    if args.export:
+        from render import PygameRenderer
+        renderer = PygameRenderer(fps=0, offscreen=True, frame_skip=args.frame_skip, frame_dir=args.export,
+                                  frame_format=args.format)
+        for _ in engine.frames(args.start, args.end):
+            renderer.draw(engine.env)
+        print(f"✔ Exported {renderer.frames_drawn} frames to {args.export}")
+    elif args.render:
+        import pygame
+        from render import PygameRenderer
+        renderer = PygameRenderer(fps=args.fps, frame_skip=args.frame_skip)
+        for _ in engine.frames(args.start, args.end):
+            pygame.event.pump()
+            renderer.draw(engine.env)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
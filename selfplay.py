@@ -0,0 +1,129 @@
+# selfplay.py
+# Hall of fame of past champions that play as player 2. Champions are kept as
+# compiled network plans (compiled_net.NetPlan), and the opponents sampled for a
+# generation are stacked into one PopulationNet, cached per sample. A generation
+# is evaluated in one go: every genome plays every sampled opponent in its own
+# slot of a VecSoccerEnv, so each step is one batched activation for the genomes,
+# one for the opponents and one vectorized env step for all matches.
+#
+# Networks are trained as player 1 (left side, attacking right). An opponent sees
+# the field mirrored left to right, so it plays player 2 as if it were player 1,
+# and its left/right actions are swapped back.
+import numpy as np
+
+from env import WIDTH, PLAYER_SIZE, BALL_SIZE
+from vec_env import VecSoccerEnv, OBS_SIZE
+from compiled_net import NetPlan, PopulationNet
+from fitness_cache import genome_hash
+
+HALL_OF_FAME_SIZE = 20  # champions kept, oldest dropped first
+OPPONENTS = 4  # opponents sampled per generation
+WEIGHT = 0.5  # share of a genome's fitness that comes from self-play
+TIMEOUT_PENALTY = 0.2  # same as the scripted evaluation's penalty for not scoring
+
+# Mirrored observation: the players swap places, x coordinates flip and the ball's
+# x velocity and the possession flag (0.5 = p1, 1 = p2) swap sides
+MIRROR_INDEX = np.array([2, 3, 0, 1, 4, 5, 6, 7, 8])
+MIRROR_SCALE = np.array([-1, 1, -1, 1, -1, 1, -1, 1, 1], dtype=np.float32)
+MIRROR_OFFSET = np.array([(WIDTH - PLAYER_SIZE) / WIDTH, 0, (WIDTH - PLAYER_SIZE) / WIDTH, 0,
+                          (WIDTH - BALL_SIZE) / WIDTH, 0, 0, 0, 0], dtype=np.float32)
+# Mirrored action: left (2) and right (3) swap, up/down/kick stay
+MIRROR_ACTION = np.array([0, 1, 3, 2, 4])
+
+
+# Observations (..., 9) as seen by player 2 playing from the left
+def mirror_obs(obs, out=None):
+    obs = np.asarray(obs, dtype=np.float32)
+    out = np.multiply(obs[..., MIRROR_INDEX], MIRROR_SCALE, out=out)
+    out += MIRROR_OFFSET
+    possession = obs[..., 8]
+    out[..., 8] = np.where(possession > 0, 1.5 - possession, 0.0)
+    return out
+
+
+class HallOfFame:
+
+    def __init__(self, config, size=HALL_OF_FAME_SIZE):
+        self.config = config
+        self.size = size
+        self.members = []  # (genome hash, genome key, NetPlan), oldest first
+        self._nets = {}  # tuple of member hashes -> PopulationNet of those opponents
+
+    def __len__(self):
+        return len(self.members)
+
+    # Adds a champion unless the same network is already in; returns whether it was added
+    def add(self, genome):
+        h = genome_hash(genome)
+        if any(member[0] == h for member in self.members):
+            return False
+        self.members.append((h, genome.key, NetPlan(genome, self.config)))
+        if len(self.members) > self.size:
+            self.members.pop(0)
+        return True
+
+    # Up to k members drawn with rng (a random.Random, so NEAT's own stream is untouched)
+    def sample(self, k, rng):
+        if len(self.members) <= k:
+            return list(self.members)
+        return rng.sample(self.members, k)
+
+    def opponents(self, members):
+        key = tuple(member[0] for member in members)
+        if key not in self._nets:
+            self._nets = {key: PopulationNet([member[2] for member in members])}  # samples rarely repeat
+        return self._nets[key]
+
+    # Checkpoints only keep the plans: compiled opponents are rebuilt on demand and
+    # the config is attached again by whoever restores the hall of fame
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_nets"] = {}
+        state["config"] = None
+        return state
+
+
+# Plays every genome against every opponent (episodes matches each) and returns
+# each genome's mean reward per match, scored like the scripted evaluation, and
+# the number of env steps played in those matches (not the steps of envs that
+# keep running after their last match while others finish). Match
+# (g, j) is seeded from seeds[g] and j, so a genome's result does not depend on
+# the rest of the batch.
+def play_selfplay(genomes, config, opponents, seeds, max_steps, decision_interval=1, episodes=1):
+    n_genomes = len(genomes)
+    n_opponents = opponents.n_genomes
+    players = PopulationNet([NetPlan(genome, config) for genome in genomes])
+
+    env = VecSoccerEnv(n_genomes * n_opponents, max_steps=max_steps)
+    for g in range(n_genomes):
+        for j in range(n_opponents):
+            env.rngs[g * n_opponents + j].seed(seeds[g] * 1009 + j)
+    obs = env.reset()
+
+    n = env.n_envs
+    mirrored = np.empty((n, OBS_SIZE), dtype=np.float32)
+    a1 = np.zeros(n, dtype=np.int64)
+    a2 = np.zeros(n, dtype=np.int64)
+    totals = np.zeros(n)
+    finished = np.zeros(n, dtype=np.int64)
+    steps = 0
+    while True:
+        playing = finished < episodes
+        if not playing.any():
+            break
+        # Both sides keep their action for decision_interval steps of their episode
+        decide = env.episode_steps % decision_interval == 0
+        out1 = players.activate(obs.reshape(n_genomes, n_opponents, OBS_SIZE))
+        mirror_obs(obs, out=mirrored)
+        out2 = opponents.activate(mirrored.reshape(n_genomes, n_opponents, OBS_SIZE).transpose(1, 0, 2))
+        a1 = np.where(decide, out1.argmax(axis=2).reshape(n), a1)
+        a2 = np.where(decide, MIRROR_ACTION[out2.argmax(axis=2).T.reshape(n)], a2)
+
+        obs, reward, done, scorer, _ = env.step(a1, a2)
+        steps += int(playing.sum())
+        totals += np.where(playing, reward, 0.0)
+        timed_out = done & (scorer == 0) & playing
+        totals -= np.where(timed_out, TIMEOUT_PENALTY, 0.0)
+        finished += done
+    scores = totals.reshape(n_genomes, n_opponents).sum(axis=1) / (n_opponents * episodes)
+    return scores, steps
@@ -0,0 +1,179 @@
+# subproc_env.py
+# Many SoccerEnvs stepped in worker processes behind a reset / step_async /
+# step_wait interface. Actions, observations, rewards, done flags and scorers
+# live in one shared memory block: each worker owns a contiguous slice of envs
+# and writes its results straight into it (observations via SoccerEnv.step_into),
+# so the pipes only carry one-word commands and nothing is pickled per step.
+#
+# Results follow VecSoccerEnv: env i is seeded with seed + i, finished envs are
+# reset right away (their last observation is in info["terminal_obs"]) and
+# max_steps ends an episode like the training timeout. The same seeds and actions
+# give the same results as VecSoccerEnv.
+#
+# Every step costs one pipe round trip per worker, so give each worker enough
+# envs (a few dozen) for the stepping to outweigh it.
+import os
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from env import SoccerEnv, OBS_SIZE
+
+# Arrays in the shared block: name, dtype and per-env shape
+FIELDS = (
+    ("actions", np.int64, (2,)),
+    ("obs", np.float32, (OBS_SIZE,)),
+    ("terminal_obs", np.float32, (OBS_SIZE,)),
+    ("reward", np.float64, ()),
+    ("done", np.bool_, ()),
+    ("scorer", np.int64, ()),
+)
+
+
+# Views of the shared arrays over buf (None: just compute the size), 8-byte aligned
+def _layout(n_envs, buf=None):
+    arrays = {}
+    offset = 0
+    for name, dtype, shape in FIELDS:
+        offset = -(-offset // 8) * 8
+        shape = (n_envs,) + shape
+        if buf is not None:
+            arrays[name] = np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return arrays, offset
+
+
+def _worker(conn, shm_name, n_envs, start, stop, seed, max_steps):
+    shm = shared_memory.SharedMemory(name=shm_name)  # the parent owns the block and unlinks it
+    arrays, _ = _layout(n_envs, shm.buf)
+    actions, obs, terminal_obs = arrays["actions"], arrays["obs"], arrays["terminal_obs"]
+    rewards, dones, scorers = arrays["reward"], arrays["done"], arrays["scorer"]
+    envs = [SoccerEnv(render_mode=False, seed=None if seed is None else seed + i) for i in range(start, stop)]
+    episode_steps = [0] * len(envs)
+    try:
+        while True:
+            command = conn.recv()
+            if command == "step":
+                for j, env in enumerate(envs):
+                    i = start + j
+                    a1, a2 = actions[i].tolist()
+                    reward, done, scorer = env.step_into(a1, a2, terminal_obs[i])
+                    episode_steps[j] += 1
+                    if max_steps is not None and episode_steps[j] >= max_steps:
+                        done = True
+                    rewards[i] = reward
+                    dones[i] = done
+                    scorers[i] = scorer
+                    if done:
+                        env.reset()
+                        env.write_obs(obs[i])
+                        episode_steps[j] = 0
+                    else:
+                        obs[i] = terminal_obs[i]
+            elif command == "reset":
+                for j, env in enumerate(envs):
+                    env.reset()
+                    env.write_obs(obs[start + j])
+                    episode_steps[j] = 0
+            elif command == "close":
+                break
+            conn.send(None)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        del actions, obs, terminal_obs, rewards, dones, scorers, arrays
+        shm.close()
+
+
+class SubprocVecEnv:
+
+    def __init__(self, n_envs, n_workers=None, seed=None, max_steps=None):
+        self.n_envs = n_envs
+        self.n_workers = max(1, min(n_envs, n_workers or os.cpu_count() or 1))
+        self.max_steps = max_steps
+        _, size = _layout(n_envs)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self._arrays, _ = _layout(n_envs, self.shm.buf)
+
+        bounds = np.linspace(0, n_envs, self.n_workers + 1).astype(int)
+        self.conns = []
+        self.processes = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            conn, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_worker, args=(child, self.shm.name, n_envs, int(start), int(stop), seed, max_steps),
+                daemon=True)
+            process.start()
+            child.close()
+            self.conns.append(conn)
+            self.processes.append(process)
+        self.waiting = False
+        self.closed = False
+
+    def _send(self, command):
+        for conn in self.conns:
+            conn.send(command)
+
+    def _wait(self):
+        for conn in self.conns:
+            conn.recv()
+
+    def reset(self):
+        if self.waiting:
+            self.step_wait()
+        self._send("reset")
+        self._wait()
+        return self._arrays["obs"].copy()
+
+    # Hands the actions to the workers and returns at once
+    def step_async(self, action1, action2):
+        if self.waiting:
+            raise RuntimeError("step_async called twice without step_wait")
+        actions = self._arrays["actions"]
+        actions[:, 0] = action1
+        actions[:, 1] = action2
+        self._send("step")
+        self.waiting = True
+
+    # Returns (obs, reward, done, scorer, info) of the step started by step_async
+    def step_wait(self):
+        if not self.waiting:
+            raise RuntimeError("step_wait called without step_async")
+        self._wait()
+        self.waiting = False
+        arrays = self._arrays
+        return (arrays["obs"].copy(), arrays["reward"].copy(), arrays["done"].copy(), arrays["scorer"].copy(),
+                {"terminal_obs": arrays["terminal_obs"].copy()})
+
+    def step(self, action1, action2):
+        self.step_async(action1, action2)
+        return self.step_wait()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.waiting:
+            self._wait()
+        try:
+            self._send("close")
+        except (BrokenPipeError, OSError):
+            pass
+        for process in self.processes:
+            process.join()
+        for conn in self.conns:
+            conn.close()
+        self._arrays = None  # views must go before the block is closed
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        if not getattr(self, "closed", True):
+            self.close()
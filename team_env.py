@@ -0,0 +1,393 @@
+# team_env.py
+# N-v-N version of SoccerEnv. Team A (players 0..n-1) starts on the left and
+# attacks right like p1, team B (players n..2n-1) mirrors it like p2, and each
+# side keeps its scripted goalkeeper. Every player has its own action slot, and
+# step() returns one observation row per player (see write_obs) plus team A's
+# reward.
+#
+# Contacts are found through a uniform grid (SpatialGrid) that is rebuilt each
+# step. Ball/player checks only look at the cells under the ball, and
+# player/player checks only look at neighbouring cells, so a step costs roughly
+# linear time in the number of players instead of checking every pair.
+#
+# With team_size=1 and collisions=False the rules are SoccerEnv's, including the
+# order of random draws, so a TeamSoccerEnv and a SoccerEnv with the same seed
+# and actions play the same match.
+import math
+import random
+
+import numpy as np
+
+from physics import Rect
+from env import WIDTH, HEIGHT, PLAYER_SIZE, BALL_SIZE, PLAYER_SPEED, BALL_SPEED, GOAL_WIDTH, OBS_SIZE
+
+MAX_TEAM_SIZE = 11
+CELL_SIZE = 40  # at least PLAYER_SIZE, so overlapping players sit in the same or adjacent cells
+LOSS_PROBABILITY = 0.01
+# Kickoff formation: columns of up to 4 players, 60 px apart, starting 100 px from the goal line
+FORMATION_ROWS = (0, -100, 100, -180)
+FORMATION_SPACING = 60
+
+
+class SpatialGrid:
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.rects = []
+        self.max_size = 0
+
+    # Buckets every rect by the cell of its top-left corner
+    def build(self, rects):
+        size = self.cell_size
+        cells = {}
+        for i, rect in enumerate(rects):
+            key = (rect.x // size, rect.y // size)
+            if key in cells:
+                cells[key].append(i)
+            else:
+                cells[key] = [i]
+        self.cells = cells
+        self.rects = rects
+        self.max_size = max((max(rect.w, rect.h) for rect in rects), default=0)
+
+    # Indices of the rects colliding with rect, in index order
+    def query(self, rect):
+        size = self.cell_size
+        cells = self.cells
+        rects = self.rects
+        hits = []
+        # A rect overlaps only if its top-left lies within max_size before rect's far edges
+        for cx in range((rect.x - self.max_size + 1) // size, (rect.x + rect.w - 1) // size + 1):
+            for cy in range((rect.y - self.max_size + 1) // size, (rect.y + rect.h - 1) // size + 1):
+                for i in cells.get((cx, cy), ()):
+                    if rect.colliderect(rects[i]):
+                        hits.append(i)
+        hits.sort()
+        return hits
+
+    # Colliding pairs (i, j), i < j, in order; needs cell_size >= the largest rect
+    def pairs(self):
+        cells = self.cells
+        rects = self.rects
+        pairs = []
+        for (cx, cy), members in cells.items():
+            for a, i in enumerate(members):
+                for j in members[a + 1:]:
+                    if rects[i].colliderect(rects[j]):
+                        pairs.append((min(i, j), max(i, j)))
+            # Each pair of neighbouring cells is visited from one side only
+            for key in ((cx + 1, cy - 1), (cx + 1, cy), (cx + 1, cy + 1), (cx, cy + 1)):
+                for j in cells.get(key, ()):
+                    for i in members:
+                        if rects[i].colliderect(rects[j]):
+                            pairs.append((min(i, j), max(i, j)))
+        pairs.sort()
+        return pairs
+
+
+class TeamSoccerEnv:
+
+    def __init__(self, team_size=1, render_mode=False, seed=None, renderer=None, collisions=True):
+        if not 1 <= team_size <= MAX_TEAM_SIZE:
+            raise ValueError(f"team_size must be between 1 and {MAX_TEAM_SIZE}, got {team_size}")
+        self.team_size = team_size
+        self.n_players = 2 * team_size
+        self.collisions = collisions  # push overlapping players apart
+        self.rng = random.Random(seed)
+        if renderer is not None:
+            render_mode = True
+        elif render_mode == True:
+            from render import PygameRenderer
+            renderer = PygameRenderer()
+        self.renderer = renderer
+        self.screen = renderer.screen if renderer is not None else None
+        self.render_mode = render_mode
+        self.homes = [self._home(i) for i in range(self.n_players)]
+        self.grid = SpatialGrid()
+        self.stepcount = 0
+        self.reset()
+
+    def seed(self, seed):
+        self.rng.seed(seed)
+
+    # 0 for team A, 1 for team B
+    def team_of(self, i):
+        return 0 if i < self.team_size else 1
+
+    # Kickoff position (top-left) of player i
+    def _home(self, i):
+        team, k = divmod(i, self.team_size)
+        dx = 100 + FORMATION_SPACING * (k // len(FORMATION_ROWS))
+        y = HEIGHT // 2 + FORMATION_ROWS[k % len(FORMATION_ROWS)]
+        return (dx if team == 0 else WIDTH - dx, y)
+
+    def reset(self):
+        self.players = [Rect(x, y, PLAYER_SIZE, PLAYER_SIZE) for x, y in self.homes]
+        self.ball = Rect(WIDTH // 2, HEIGHT // 2, BALL_SIZE, BALL_SIZE)
+        self.ball_vel = [self.rng.randint(-1, 1), 0]
+        self.gk1 = Rect(10, HEIGHT // 2, PLAYER_SIZE, PLAYER_SIZE)  # Left goal
+        self.gk2 = Rect(WIDTH - 30, HEIGHT // 2, PLAYER_SIZE, PLAYER_SIZE)  # Right goal
+        self.done = False
+        self.possession = 0  # 0 = none, 1 = team A, 2 = team B
+        self.holder = -1  # player with the ball
+        return self.get_obs()
+
+    def get_obs(self):
+        obs = np.empty((self.n_players, OBS_SIZE), dtype=np.float32)
+        self.write_obs(obs)
+        return obs
+
+    # Row i is player i's view in SoccerEnv's layout: the team A and team B players
+    # of its duel (player i and the nearest opponent), the ball, the ball velocity
+    # and possession / 2. Team B rows are left unmirrored, as SoccerEnv shows p2;
+    # selfplay.mirror_obs turns them into a left-side view.
+    def write_obs(self, out):
+        n = self.team_size
+        positions = np.array([(p.x, p.y) for p in self.players], dtype=np.float64)
+        centers = positions + PLAYER_SIZE // 2
+        a, b = centers[:n], centers[n:]
+        dist2 = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2)
+        a_rival = dist2.argmin(axis=1)  # nearest team B player of each team A player
+        b_rival = dist2.argmin(axis=0)
+        out[:n, 0:2] = positions[:n] / (WIDTH, HEIGHT)
+        out[:n, 2:4] = positions[n + a_rival] / (WIDTH, HEIGHT)
+        out[n:, 0:2] = positions[b_rival] / (WIDTH, HEIGHT)
+        out[n:, 2:4] = positions[n:] / (WIDTH, HEIGHT)
+        out[:, 4] = self.ball.x / WIDTH
+        out[:, 5] = self.ball.y / HEIGHT
+        out[:, 6] = self.ball_vel[0] / BALL_SPEED
+        out[:, 7] = self.ball_vel[1] / BALL_SPEED
+        out[:, 8] = self.possession / 2
+
+    # actions holds one action (0-4, as in SoccerEnv) per player. Returns
+    # (obs, reward, done, scorer, info) with team A's reward and scorer 1 (team A)
+    # or 2 (team B) when a goal ends the match.
+    def step(self, actions):
+        n = self.team_size
+        team_a = self.players[:n]
+        old_dist = self._ball_distance(team_a)
+        scorer = 0
+        for player, action in zip(self.players, actions):
+            self._move_player(player, action)
+        self.grid.build(self.players)
+        if self.collisions:
+            self._separate_players()
+        self._handle_possession(actions)
+
+        reward = 0.0
+
+        # Reward for gaining possession
+        if self.possession == 1:
+            reward += 0.01
+
+        # Reward for moving closer to the ball
+        if self._ball_distance(team_a) < old_dist:
+            reward += 0.02
+
+        for i in range(n):
+            if actions[i] == 4 and self.holder != i:
+                reward -= 0.5  # Penalty for kicking without possession
+
+        holder = self.holder
+        if holder >= 0 and actions[holder] == 4:
+            if holder < n:
+                self._kick(1)  # Kick right
+                if self.ball.x > WIDTH * 0.7:
+                    reward += 0.23  # More incentive to kick near goal
+                else:
+                    reward += 0.05  # Base reward for trying to kick
+            else:
+                self._kick(-1)  # Kick left
+
+        self._move_ball()
+
+        goal_top = HEIGHT // 2 - GOAL_WIDTH // 2
+        goal_bottom = HEIGHT // 2 + GOAL_WIDTH // 2
+        if self.ball.left <= 0 and goal_top <= self.ball.y <= goal_bottom:
+            scorer = 2
+            reward -= 0.5
+            self.done = True
+        elif self.ball.right >= WIDTH and goal_top <= self.ball.y <= goal_bottom:
+            scorer = 1
+            reward += 2.0
+            if any(actions[i] == 4 for i in range(n)):  # last action was a kick
+                reward += 0.5
+            self.done = True
+
+        if self.stepcount % 5 == 0:
+            self._move_goalkeepers()
+        self.stepcount += 1
+
+        if self.render_mode:
+            self.renderer.draw(self)
+
+        return self.get_obs(), reward, self.done, scorer, {}
+
+    # Distance from the ball to the closest of players (centers)
+    def _ball_distance(self, players):
+        bx, by = self.ball.centerx, self.ball.centery
+        best = math.inf
+        for p in players:
+            dx = p.x + PLAYER_SIZE // 2 - bx
+            dy = p.y + PLAYER_SIZE // 2 - by
+            best = min(best, dx * dx + dy * dy)
+        return math.sqrt(best)
+
+    def _move_player(self, player, action):
+        if action == 0: player.y -= PLAYER_SPEED  # up
+        elif action == 1: player.y += PLAYER_SPEED  # down
+        elif action == 2: player.x -= PLAYER_SPEED  # left
+        elif action == 3: player.x += PLAYER_SPEED  # right
+
+        player.x = max(0, min(WIDTH - PLAYER_SIZE, player.x))
+        player.y = max(0, min(HEIGHT - PLAYER_SIZE, player.y))
+
+    # Pushes each overlapping pair apart along the axis where they overlap least,
+    # then rebuilds the grid for the ball checks
+    def _separate_players(self):
+        pairs = self.grid.pairs()
+        if not pairs:
+            return
+        players = self.players
+        for i, j in pairs:
+            a, b = players[i], players[j]
+            overlap_x = min(a.x, b.x) + PLAYER_SIZE - max(a.x, b.x)
+            overlap_y = min(a.y, b.y) + PLAYER_SIZE - max(a.y, b.y)
+            if overlap_x <= 0 or overlap_y <= 0:
+                continue  # already apart after an earlier push
+            if overlap_x <= overlap_y:
+                first, second = (a, b) if a.x <= b.x else (b, a)
+                first.x = max(0, first.x - overlap_x // 2)
+                second.x = min(WIDTH - PLAYER_SIZE, second.x + overlap_x - overlap_x // 2)
+            else:
+                first, second = (a, b) if a.y <= b.y else (b, a)
+                first.y = max(0, first.y - overlap_y // 2)
+                second.y = min(HEIGHT - PLAYER_SIZE, second.y + overlap_y - overlap_y // 2)
+        self.grid.build(players)
+
+    def _handle_possession(self, actions):
+        ball = self.ball
+        if ball.colliderect(self.gk1):
+            self.ball_vel[0] = abs(self.ball_vel[0])  # bounce to the right
+        if ball.colliderect(self.gk2):
+            self.ball_vel[0] = -abs(self.ball_vel[0])
+
+        # The holder loses the ball when out of contact, or at random
+        holder = self.holder
+        if holder >= 0:
+            if not ball.colliderect(self.players[holder]) or self.rng.random() < LOSS_PROBABILITY:
+                self.possession = 0
+                self.holder = -1
+                return
+            # Still in contact: the holder dribbles
+            action = actions[holder]
+            if action != 4:
+                if action == 0: self.ball_vel[1] = -PLAYER_SPEED  # up
+                elif action == 1: self.ball_vel[1] = PLAYER_SPEED  # down
+                elif action == 2: self.ball_vel[0] = -PLAYER_SPEED  # left
+                elif action == 3: self.ball_vel[0] = PLAYER_SPEED  # right
+                self._move_ball()
+            return
+
+        # Loose ball: one of the players touching it takes it
+        close = self.grid.query(ball)
+        if not close:
+            return
+        holder = close[0] if len(close) == 1 else self.rng.choice(close)
+        self.holder = holder
+        self.possession = self.team_of(holder) + 1
+        ball.center = self.players[holder].center
+
+    # direction is 1 (right, team A) or -1 (left, team B)
+    def _kick(self, direction):
+        self.ball_vel[0] = direction * BALL_SPEED
+        self.ball_vel[1] = 0
+        self.possession = 0
+        self.holder = -1
+
+    def _move_goalkeepers(self):
+        goal_top = HEIGHT // 2 - GOAL_WIDTH // 2
+        goal_bottom = HEIGHT // 2 + GOAL_WIDTH // 2
+        reaction_chance = 0.5
+        offset_range = 50
+
+        if self.rng.random() < reaction_chance:
+            target_y1 = self.ball.centery + self.rng.randint(-offset_range, offset_range)
+            if target_y1 < self.gk1.centery:
+                self.gk1.y -= PLAYER_SPEED
+            elif target_y1 > self.gk1.centery:
+                self.gk1.y += PLAYER_SPEED
+
+        if self.rng.random() < reaction_chance:
+            target_y2 = self.ball.centery + self.rng.randint(-offset_range, offset_range)
+            if target_y2 < self.gk2.centery:
+                self.gk2.y -= PLAYER_SPEED
+            elif target_y2 > self.gk2.centery:
+                self.gk2.y += PLAYER_SPEED
+
+        self.gk1.y = max(goal_top, min(goal_bottom - PLAYER_SIZE, self.gk1.y))
+        self.gk2.y = max(goal_top, min(goal_bottom - PLAYER_SIZE, self.gk2.y))
+
+    def _move_ball(self):
+        self.ball.x += self.ball_vel[0]
+        self.ball.y += self.ball_vel[1]
+
+        if self.ball.top <= 0 or self.ball.bottom >= HEIGHT:
+            self.ball_vel[1] *= -1
+
+    def render(self):
+        self.renderer.draw(self)
+
+
+def _direction_to(src, dst):
+    dx = dst[0] - src[0]
+    dy = dst[1] - src[1]
+    if abs(dx) > abs(dy):
+        return 3 if dx > 0 else 2  # right or left
+    else:
+        return 1 if dy > 0 else 0  # down or up
+
+
+def _closest(players, indices, point):
+    return min(indices, key=lambda i: (players[i].centerx - point[0]) ** 2 + (players[i].centery - point[1]) ** 2)
+
+
+# Scripted actions for every player of team (0 = A, 1 = B), generalizing
+# train_neat.get_agent2_action: the holder heads for the opponent's goal and
+# shoots once level with it. Without the ball, the teammate closest to the ball
+# (or to the opposing holder) goes for it, and the rest keep their formation
+# position, 120 px further forward while their team has the ball. With one
+# player per side this plays exactly like get_agent2_action.
+def scripted_actions(env, team):
+    n = env.team_size
+    players = env.players
+    indices = range(team * n, (team + 1) * n)
+    goal_y = HEIGHT // 2
+    attack_x = WIDTH if team == 0 else 0
+    forward = 1 if team == 0 else -1
+    holder = env.holder
+    own_ball = holder >= 0 and env.team_of(holder) == team
+    target = players[holder].center if holder >= 0 and not own_ball else env.ball.center
+    chaser = None if own_ball else _closest(players, indices, target)
+
+    actions = []
+    for i in indices:
+        player = players[i]
+        if i == holder:
+            if abs(player.centery - goal_y) < 40:
+                actions.append(4)  # kick
+            else:
+                actions.append(_direction_to(player.center, (attack_x, goal_y)))
+        elif i == chaser:
+            actions.append(_direction_to(player.center, target))
+        else:
+            home_x, home_y = env.homes[i]
+            if own_ball:
+                home_x += forward * 120  # support the attack
+            dx, dy = home_x - player.x, home_y - player.y
+            if abs(dx) > PLAYER_SPEED or abs(dy) > PLAYER_SPEED:
+                actions.append(_direction_to(player.topleft, (home_x, home_y)))
+            else:
+                actions.append(2 + env.stepcount % 2)  # hold position, stepping left and right
+    return actions
@@ -0,0 +1,382 @@
+# tournament.py
+# Headless round robin between saved genomes and the scripted opponents, with
+# win/draw/loss counts and Elo ratings.
+#
+#   python tournament.py                                  # every checkpoint + both scripted opponents
+#   python tournament.py best_gen_gen40.pkl winner.pkl --workers 8 --output tournament.json
+#   python tournament.py --lookahead                      # also the shallow-search opponent
+#
+# Every pairing is played in pairs of games on the same seed with the sides
+# swapped, so neither player profits from a side or a lucky kickoff. Networks
+# were trained as player 1; as player 2 they see the field mirrored
+# (selfplay.mirror_obs). The scripted opponents were written for player 2; as
+# player 1 they are handed a mirrored view of the env. A goal wins the game and
+# a timeout (MAX_STEPS) is a draw.
+#
+# A pairing stops as soon as a sequential probability ratio test (normal
+# approximation on the pair scores) decides that one player is ELO_MARGIN
+# stronger than the other, or after MAX_PAIRS pairs. Pairings run in parallel
+# across worker processes. Ratings are a Bradley-Terry fit of all results with
+# the training opponent (get_agent2_action) at 0 Elo and bootstrap confidence
+# intervals.
+import os
+import sys
+import json
+import math
+import pickle
+import argparse
+import multiprocessing
+
+import numpy as np
+
+from physics import Rect
+from env import SoccerEnv, WIDTH
+from lookahead import LookaheadAgent, TIME_BUDGET
+
+CONFIG_PATH = "config-feedforward.txt"
+SEED = 7
+MAX_STEPS = 300  # same timeout as training
+MIN_PAIRS = 4  # pairs played before the test may stop a pairing
+MAX_PAIRS = 100
+ELO_MARGIN = 50.0  # the test decides between "A is this much stronger" and "B is"
+ALPHA = 0.05  # chance of naming the wrong player stronger
+BETA = 0.05
+# The variance of the pair scores starts from that of two coin-flip games, worth
+# PRIOR_PAIRS pairs, so a few similar early results cannot end a pairing
+PRIOR_VAR = 0.125
+PRIOR_PAIRS = 4
+BOOTSTRAP = 200
+CONFIDENCE = 0.95
+SCRIPTED = ("get_agent2_action", "rule_based_agent2")
+ANCHOR = "get_agent2_action"
+SWAP_RESULT = (0, 2, 1)  # a game's result seen from the other side
+
+
+def expected_score(elo):
+    return 1.0 / (1.0 + 10.0 ** (-elo / 400.0))
+
+
+# Log-likelihood ratio of "score = s1" against "score = s0" for per-pair scores
+# (generalized SPRT, normal approximation); 0 (no evidence) without scores
+def llr(scores, s0, s1):
+    n = len(scores)
+    if n == 0:
+        return 0.0
+    mean = sum(scores) / n
+    var = (sum((x - mean) ** 2 for x in scores) + PRIOR_PAIRS * PRIOR_VAR) / (n + PRIOR_PAIRS)
+    return n * (s1 - s0) * (2.0 * mean - s0 - s1) / (2.0 * var)
+
+
+# The env as player 1 sees it when it plays from the right: sides swapped,
+# x mirrored and possession flags exchanged, so player 2 code can drive player 1
+class MirrorView:
+
+    def __init__(self, env):
+        self.env = env
+
+    @staticmethod
+    def _mirror(rect):
+        return Rect(WIDTH - rect.x - rect.w, rect.y, rect.w, rect.h)
+
+    @property
+    def p1(self):
+        return self._mirror(self.env.p2)
+
+    @property
+    def p2(self):
+        return self._mirror(self.env.p1)
+
+    @property
+    def ball(self):
+        return self._mirror(self.env.ball)
+
+    @property
+    def possession(self):
+        return (0, 2, 1)[self.env.possession]
+
+    def _distance(self, a, b):
+        return self.env._distance(a, b)
+
+
+class NetPlayer:
+
+    def __init__(self, name, net):
+        self.name = name
+        self.net = net
+
+    def act(self, env, obs, side):
+        from selfplay import mirror_obs, MIRROR_ACTION
+        if side == 1:
+            return int(np.argmax(self.net.activate(obs)))
+        return int(MIRROR_ACTION[np.argmax(self.net.activate(mirror_obs(obs)))])
+
+
+class ScriptedPlayer:
+
+    def __init__(self, name, policy):
+        self.name = name
+        self.policy = policy
+
+    def act(self, env, obs, side):
+        from selfplay import MIRROR_ACTION
+        if side == 2:
+            return self.policy(env)
+        return int(MIRROR_ACTION[self.policy(MirrorView(env))])
+
+
+# The search plays either side on the real env, no mirroring needed
+class SearchPlayer:
+
+    def __init__(self, name, agent):
+        self.name = name
+        self.agent = agent
+
+    def act(self, env, obs, side):
+        return self.agent.act(env, side)
+
+
+# Plays one game and returns 1 if the left player scored, 2 if the right one did, 0 on timeout
+def play_game(env, left, right, seed, max_steps=MAX_STEPS):
+    from replay import start_match
+    start_match(env, seed)
+    obs = env.reset()
+    for _ in range(max_steps):
+        a1 = left.act(env, obs, 1)
+        a2 = right.act(env, obs, 2)
+        obs, _, done, scorer, _ = env.step(a1, a2)
+        if done:
+            return scorer
+    return 0
+
+
+_worker_config = None
+
+
+def _init_worker(config_path):
+    global _worker_config
+    import neat
+    _worker_config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                                 neat.DefaultStagnation, config_path)
+
+
+# spec: ("net", name, genome), ("scripted", name) or ("lookahead", name, budget)
+def make_player(spec):
+    if spec[0] == "scripted":
+        import train_neat
+        return ScriptedPlayer(spec[1], getattr(train_neat, spec[1]))
+    if spec[0] == "lookahead":
+        return SearchPlayer(spec[1], LookaheadAgent(spec[2]))
+    from compiled_net import ScalarNet, NetPlan
+    return NetPlayer(spec[1], ScalarNet(NetPlan(spec[2], _worker_config)))
+
+
+def _pair_seed(seed, i, j, k):
+    return (seed * 1000003 + i * 10007 + j) * 1009 + k
+
+
+# Plays one pairing until the test decides it; returns its counts from player i's side
+def play_pairing(task):
+    i, j, spec_i, spec_j, seed, settings = task
+    a, b = make_player(spec_i), make_player(spec_j)
+    env = SoccerEnv(render_mode=False)
+    s0, s1 = expected_score(-settings["elo_margin"]), expected_score(settings["elo_margin"])
+    upper = math.log((1 - settings["beta"]) / settings["alpha"])
+    lower = math.log(settings["beta"] / (1 - settings["alpha"]))
+    wins = draws = losses = 0
+    pair_scores = []
+    verdict = None
+    while len(pair_scores) < settings["max_pairs"]:
+        game_seed = _pair_seed(seed, i, j, len(pair_scores))
+        # a plays left, then right, from the same kickoff; results are from a's side
+        results = (play_game(env, a, b, game_seed), SWAP_RESULT[play_game(env, b, a, game_seed)])
+        points = 0.0
+        for result in results:
+            if result == 1:
+                wins += 1
+                points += 1.0
+            elif result == 2:
+                losses += 1
+            else:
+                draws += 1
+                points += 0.5
+        pair_scores.append(points / 2)
+        if len(pair_scores) >= settings["min_pairs"]:
+            ratio = llr(pair_scores, s0, s1)
+            if ratio >= upper:
+                verdict = i
+                break
+            if ratio <= lower:
+                verdict = j
+                break
+    return {"i": i, "j": j, "wins": wins, "draws": draws, "losses": losses, "verdict": verdict,
+            "llr": llr(pair_scores, s0, s1), "pair_scores": pair_scores}
+
+
+# Bradley-Terry strengths from points[i, j] (points i took from j, draws count
+# half) and games[i, j], as Elo with the anchor player at 0. One virtual draw per
+# pairing keeps players that won or lost everything finite.
+def fit_elo(points, games, anchor=None, iterations=1000):
+    n = len(points)
+    off_diagonal = 1.0 - np.eye(n)
+    points = points + 0.5 * off_diagonal
+    games = games + off_diagonal
+    strength = np.ones(n)
+    wins = points.sum(axis=1)
+    for _ in range(iterations):
+        new = wins / (games / (strength[:, None] + strength[None, :])).sum(axis=1)
+        new /= np.exp(np.log(new).mean())
+        done = np.abs(np.log(new / strength)).max() < 1e-10
+        strength = new
+        if done:
+            break
+    elo = 400.0 * np.log10(strength)
+    return elo - (elo[anchor] if anchor is not None else elo.mean())
+
+
+# Ratings plus confidence intervals from refitting on pairings resampled pair by pair
+def rate(n_players, pairings, anchor=None, bootstrap=BOOTSTRAP, confidence=CONFIDENCE, seed=SEED):
+    def matrices(scores_of):
+        points = np.zeros((n_players, n_players))
+        games = np.zeros((n_players, n_players))
+        for pairing in pairings:
+            scores = scores_of(pairing)
+            i, j = pairing["i"], pairing["j"]
+            points[i, j] = 2 * np.sum(scores)
+            points[j, i] = 2 * len(scores) - points[i, j]
+            games[i, j] = games[j, i] = 2 * len(scores)
+        return points, games
+
+    elo = fit_elo(*matrices(lambda pairing: pairing["pair_scores"]), anchor)
+    rng = np.random.default_rng(seed)
+    samples = np.array([fit_elo(*matrices(lambda pairing: rng.choice(pairing["pair_scores"],
+                                                                      len(pairing["pair_scores"]))), anchor)
+                        for _ in range(bootstrap)])
+    tail = (1.0 - confidence) / 2 * 100
+    low, high = np.percentile(samples, [tail, 100 - tail], axis=0)
+    return elo, low, high
+
+
+# Genome checkpoints become one player each, identical networks (winner.pkl is
+# usually the last best_gen checkpoint) sharing a player; specs as in make_player
+def load_players(paths, scripted=SCRIPTED):
+    from fitness_cache import genome_hash
+    specs = []
+    by_hash = {}
+    for path in paths:
+        with open(path, "rb") as f:
+            genome = pickle.load(f)
+        name = os.path.basename(path)
+        h = genome_hash(genome)
+        if h in by_hash:
+            index = by_hash[h]
+            specs[index] = ("net", f"{specs[index][1]} = {name}", genome)
+            continue
+        by_hash[h] = len(specs)
+        specs.append(("net", name, genome))
+    specs.extend(("scripted", name) for name in scripted)
+    return specs
+
+
+def run_tournament(specs, config_path=CONFIG_PATH, workers=None, seed=SEED, min_pairs=MIN_PAIRS,
+                   max_pairs=MAX_PAIRS, elo_margin=ELO_MARGIN, alpha=ALPHA, beta=BETA, progress=print):
+    if max_pairs < 1 or min_pairs > max_pairs:
+        raise ValueError(f"need 1 <= max_pairs and min_pairs <= max_pairs, got {min_pairs} and {max_pairs}")
+    settings = {"min_pairs": min_pairs, "max_pairs": max_pairs, "elo_margin": elo_margin, "alpha": alpha, "beta": beta}
+    tasks = [(i, j, specs[i], specs[j], seed, settings) for i in range(len(specs)) for j in range(i + 1, len(specs))]
+    names = [spec[1] for spec in specs]
+
+    pairings = []
+    if workers == 1:
+        _init_worker(config_path)
+        results = map(play_pairing, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(config_path,))
+        results = pool.imap_unordered(play_pairing, tasks)
+    try:
+        for result in results:
+            pairings.append(result)
+            if progress:
+                verdict = "undecided" if result["verdict"] is None else f"{names[result['verdict']]} stronger"
+                progress(f"[{len(pairings)}/{len(tasks)}] {names[result['i']]} vs {names[result['j']]}: "
+                         f"+{result['wins']} ={result['draws']} -{result['losses']} ({verdict})")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    pairings.sort(key=lambda pairing: (pairing["i"], pairing["j"]))
+
+    anchor = names.index(ANCHOR) if ANCHOR in names else None
+    elo, low, high = rate(len(specs), pairings, anchor, seed=seed)
+    wdl = [[None] * len(specs) for _ in specs]  # row player's (wins, draws, losses) against the column player
+    for pairing in pairings:
+        i, j = pairing["i"], pairing["j"]
+        wdl[i][j] = (pairing["wins"], pairing["draws"], pairing["losses"])
+        wdl[j][i] = (pairing["losses"], pairing["draws"], pairing["wins"])
+    return {
+        "players": names,
+        "wdl": wdl,
+        "elo": elo.tolist(),
+        "elo_low": low.tolist(),
+        "elo_high": high.tolist(),
+        "pairings": [{key: value for key, value in pairing.items() if key != "pair_scores"} | {"pairs": len(pairing["pair_scores"])}
+                     for pairing in pairings],
+        "settings": settings | {"seed": seed, "max_steps": MAX_STEPS},
+    }
+
+
+def print_report(results):
+    names = results["players"]
+    width = max(len(name) for name in names)
+    print(f"\n{'':{width}s}  " + "  ".join(f"{k:>11d}" for k in range(len(names))))
+    for i, name in enumerate(names):
+        cells = ["-".center(11) if wdl is None else f"{wdl[0]:>3d}/{wdl[1]:>3d}/{wdl[2]:>3d}" for wdl in results["wdl"][i]]
+        print(f"{name:{width}s}  " + "  ".join(cells) + f"   [{i}]")
+    print(f"(row player's wins/draws/losses against each column)\n")
+
+    order = sorted(range(len(names)), key=lambda i: -results["elo"][i])
+    print(f"{'player':{width}s} {'elo':>7s}   {int(CONFIDENCE * 100)}% interval   games")
+    for i in order:
+        games = sum(sum(wdl) for wdl in results["wdl"][i] if wdl is not None)
+        print(f"{names[i]:{width}s} {results['elo'][i]:7.0f}   [{results['elo_low'][i]:6.0f}, {results['elo_high'][i]:6.0f}]"
+              f"   {games:5d}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Round robin between saved genomes and the scripted opponents")
+    parser.add_argument("genomes", nargs="*", help="genome .pkl files (default: every best_gen_gen*.pkl and winner.pkl)")
+    parser.add_argument("--config", default=CONFIG_PATH, help="NEAT config file")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per CPU, 1 = serial)")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--max-pairs", type=int, default=MAX_PAIRS, help="game pairs per pairing at most")
+    parser.add_argument("--elo-margin", type=float, default=ELO_MARGIN,
+                        help="Elo difference the early-stop test is set to detect")
+    parser.add_argument("--no-scripted", action="store_true", help="leave the scripted opponents out")
+    parser.add_argument("--lookahead", action="store_true", help="add the shallow-search opponent (lookahead.py)")
+    parser.add_argument("--lookahead-budget", type=float, default=TIME_BUDGET * 1000,
+                        help="its time per move in ms")
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+    if args.max_pairs < 1:
+        parser.error("--max-pairs must be at least 1")
+
+    from heatmap import checkpoints
+    specs = load_players(args.genomes or checkpoints(), () if args.no_scripted else SCRIPTED)
+    if args.lookahead:
+        specs.append(("lookahead", "lookahead", args.lookahead_budget / 1000))
+    if len(specs) < 2:
+        print("Need at least two players")
+        return 1
+    # A short --max-pairs also lowers the pairs played before the test may stop
+    results = run_tournament(specs, args.config, args.workers, args.seed, min_pairs=min(MIN_PAIRS, args.max_pairs),
+                             max_pairs=args.max_pairs, elo_margin=args.elo_margin)
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✔ Results saved to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,13 +1,39 @@
 import neat
 import numpy as np
-from env import SoccerEnv
+import selfplay
+from metrics import MetricsPublisher
+from env import SoccerEnv, OBS_SIZE
+from fitness_cache import FitnessCache, genome_hash
+from compiled_net import NetCache, ScalarNet
+from profiler import profiler
+from trajectory import TrajectoryWriter
+from replay import ReplayRecorder, start_match, start_episode, SCENARIO_MODES
+from checkpoint import (Checkpointer, AppendLog, load_checkpoint, restore_population,
+                        CHECKPOINT_PATH, CHECKPOINT_INTERVAL)
 import os
-import matplotlib.pyplot as plt
-import csv
+import sys
+import math
+import time
+import random
+import logging
+import argparse
+import multiprocessing
 from datetime import datetime
 #import visualize
 
+GENERATIONS = 50
 EPISODES = 5
+MAX_STEPS = 300
+DECISION_INTERVAL = 1  # physics steps per network/opponent decision
+OBS_LOG_PATH = "obs_log_gen1.npy"  # trajectory of the first genome of generation 1
+NUM_WORKERS = 1  # processes used to evaluate a generation
+SEED = 42  # base seed for NEAT and for the evaluation matches
+RACING = False  # adaptive episode budget, see race_genomes
+SELFPLAY = False  # also play past champions, see selfplay.py
+RACING_SCHEDULE = (1, 3)  # episodes played by every genome still racing before each elimination round
+RACING_CONFIDENCE = 1.0  # standard errors of slack a genome gets before it is dropped
+CRN = None  # common random numbers: None, or one of CRN_MODES
+CRN_MODES = SCENARIO_MODES
 WIDTH, HEIGHT = 640, 480
 PLAYER_SIZE = 20
 BALL_SIZE = 10
@@ -15,6 +41,8 @@ PLAYER_SPEED = 5
 BALL_SPEED = 6
 GOAL_WIDTH = 80
 
+logger = logging.getLogger("train_neat")
+
 # Convert output to discrete action (0-4)
 def interpret_output(output):
     return np.argmax(output)
@@ -22,6 +50,9 @@ def interpret_output(output):
 max_fitnesses = []
 generation_counter = [0]  # use list so it can be mutated inside the function
 goal_ratio = []
+fitness_cache = FitnessCache()
+net_cache = NetCache()  # compiled networks of recently evaluated genomes
+hall_of_fame = None  # selfplay.HallOfFame when training with self-play
 
 def get_agent2_action(env):
     p2 = env.p2
@@ -78,51 +109,265 @@ def rule_based_agent2(env):
 
 def eval_genomes(genomes, config):
     generation_counter[0] += 1
-    print(f"\n=== Generation {generation_counter[0]} ===")
+    logger.info(f"\n=== Generation {generation_counter[0]} ===")
+    start = time.perf_counter()
 
     best_genome = None
+    best_recorder = None
     best_fitness = float('-inf')
 
-    i=0
-    for genome_id, genome in genomes:
-        is_First = generation_counter[0] == 1 and i == 0
-        eval_genome(genome, config,is_First)
+    # Only the first genome of generation 1 logs its trajectory
+    entries = [(genome, OBS_LOG_PATH if generation_counter[0] == 1 and i == 0 else None)
+               for i, (genome_id, genome) in enumerate(genomes)]
+
+    # Genomes whose evaluation is already known (elites) are not simulated again
+    fitness_cache.next_generation()
+    keys = [None if log_path else evaluation_key(genome) for genome, log_path in entries]
+    results = [None if key is None else fitness_cache.get(key) for key in keys]
+    jobs = [entry for entry, result in zip(entries, results) if result is None]
+    # The best genome of a saved generation gets a replay of the matches that scored it
+    saving = generation_counter[0] % 10 == 0
+    recorders = [None] * len(entries)
+
+    if RACING:
+        known = [(genome, result[0]) for (genome, _), result in zip(entries, results) if result is not None]
+        progress = race_genomes(jobs, config, known, saving)
+        played = sum(p.episodes for p in progress)
+        logger.info(f"Racing: {played} episodes played, {len(jobs) * EPISODES - played} saved")
+    else:
+        progress = _run_episodes([(genome, EPISODES, _new_progress(genome, saving), log_path)
+                                  for genome, log_path in jobs], config)
+
+    steps = sum(p.steps for p in progress)
+    precision = ranking_precision([p.episode_rewards for p in progress if p.episodes == EPISODES], CRN is not None)
+    if precision is not None:
+        message = f"Ranking: reliability {precision['reliability']:.3f}, noise per episode {precision['noise']:.4f}"
+        if "independent_episodes" in precision:
+            message += (f", {EPISODES} common episodes rank like {precision['independent_episodes']:.1f} "
+                        f"independent ones")
+        logger.info(message)
+    fresh = iter(progress)
+    for i, key in enumerate(keys):
+        if results[i] is None:
+            p = next(fresh)
+            results[i] = p.result()
+            recorders[i] = p.recorder
+            # Genomes dropped from a race only have an estimate, which is not cached
+            if key is not None and p.episodes == EPISODES:
+                fitness_cache.put(key, results[i])
+    logger.info(f"Fitness cache: {fitness_cache.hits} hits, {fitness_cache.misses} misses")
+
+    # Part of the fitness comes from playing past champions (not cached: the opponents change)
+    played_selfplay = hall_of_fame is not None and len(hall_of_fame) > 0
+    if played_selfplay:
+        scores, selfplay_steps = _selfplay_scores([genome for genome, _ in entries], config)
+        steps += selfplay_steps
+        results = [((1 - selfplay.WEIGHT) * fitness + selfplay.WEIGHT * score, goal_rat)
+                   for (fitness, goal_rat), score in zip(results, scores)]
+
+    for i, ((genome, log_path), (fitness, goal_rat)) in enumerate(zip(entries, results)):
+        genome.fitness = fitness
+        goal_ratio.append(goal_rat)
+        if log_path:
+            logger.info(f"Logged trajectory to {log_path}")
         if genome.fitness > best_fitness:
             best_fitness = genome.fitness
             best_genome = genome
-        i+=1
+            best_recorder = recorders[i]
 
     max_fitnesses.append(best_fitness)
+    if _metrics is not None:
+        eval_time = time.perf_counter() - start
+        ratios = [goal_rat for _, goal_rat in results]
+        _metrics.publish({
+            "generation": generation_counter[0],
+            "max_fitness": best_fitness,
+            "mean_fitness": sum(genome.fitness for genome, _ in entries) / len(entries),
+            "goal_ratio": sum(ratios) / len(ratios),
+            "species": len(_species_set.species) if _species_set is not None else 1,
+            "eval_time": eval_time,
+            "steps_per_sec": steps / eval_time,
+            "ranking_reliability": precision["reliability"] if precision else None,
+            "episode_equivalent": precision.get("independent_episodes") if precision else None,
+        })
+    if hall_of_fame is not None and hall_of_fame.add(best_genome):
+        logger.info(f"Hall of fame: added genome {best_genome.key} ({len(hall_of_fame)} champions)")
+    if _fitness_log is not None:
+        _fitness_log.write([[generation_counter[0], best_fitness]])
+        first = len(goal_ratio) - len(entries)
+        _goal_log.write([[first + i + 1, ratio] for i, ratio in enumerate(goal_ratio[first:])])
 
     # Save best genome every 10 generations
-    if generation_counter[0] % 10 == 0:
+    if saving:
         import pickle
         with open(f"best_gen_gen{generation_counter[0]}.pkl", "wb") as f:
             pickle.dump(best_genome, f)
-        print(f"✔ Saved best genome of generation {generation_counter[0]} (fitness={best_fitness})")
-
+        logger.info(f"✔ Saved best genome of generation {generation_counter[0]} (fitness={best_fitness})")
+        recorder = best_recorder
+        if recorder is None:
+            # A cached result: its matches are deterministic, so they are played again
+            progress = _new_progress(best_genome, record=True)
+            play_episodes(best_genome, config, SoccerEnv(render_mode=False), EPISODES, progress)
+            recorder = progress.recorder
+        recorder.replay.selfplay = played_selfplay
+        recorder.replay.save(f"best_gen_gen{generation_counter[0]}.rpl")
+        logger.info(f"✔ Saved replay best_gen_gen{generation_counter[0]}.rpl")
+
+    if profiler.enabled:
+        profiler.report(f"generation {generation_counter[0]}")
+        profiler.reset()
+
+
+# Self-play scores of every genome against this generation's sample of the hall of
+# fame, and the env steps they took. The sample depends only on the seed and generation, and leaves NEAT's
+# random stream alone.
+def _selfplay_scores(genomes, config):
+    rng = random.Random(SEED * 7919 + generation_counter[0])
+    members = hall_of_fame.sample(selfplay.OPPONENTS, rng)
+    logger.info(f"Self-play against genomes {', '.join(str(member[1]) for member in members)}")
+    seeds = [genome_seed(genome) for genome in genomes]
+    return selfplay.play_selfplay(genomes, config, hall_of_fame.opponents(members), seeds, MAX_STEPS,
+                                  DECISION_INTERVAL)
+
+
+# Seed of the matches a genome plays; it only depends on the genome key, so a genome
+# gets the same matches whichever process evaluates it (and elites keep theirs)
+def genome_seed(genome):
+    return SEED * 1000003 + genome.key
+
+
+# Everything an evaluation's outcome depends on: the network and the matches it plays
+def evaluation_key(genome):
+    matches = genome_seed(genome) if CRN is None else (CRN, scenario_base())
+    return (genome_hash(genome), matches, EPISODES, MAX_STEPS, DECISION_INTERVAL)
+
+
+# With common random numbers every genome of a generation plays the same
+# scenarios (see replay.start_episode) instead of continuing the genome's own
+# random stream
+def scenario_base():
+    return SEED * 104729 + generation_counter[0]
+
+
+# Progress a fresh evaluation starts from: None, or one that carries the
+# generation's CRN scenarios and, with record, a recorder of the matches to
+# whichever process plays them
+def _new_progress(genome, record=False):
+    scenarios = None if CRN is None else (CRN, scenario_base())
+    if scenarios is None and not record:
+        return None
+    progress = EvalProgress(scenarios)
+    if record:
+        progress.recorder = ReplayRecorder(genome_seed(genome), scenarios)
+    return progress
+
+
+# How reliably a generation's episodes rank its genomes, from the episode rewards
+# of fully evaluated genomes (one list per genome, same episodes for all under
+# common random numbers). Noise per episode is the spread of single episode
+# rewards around the genome's mean; with common scenarios, the part every genome
+# shares (some scenarios are just easier) cancels out of comparisons, and only
+# the genome x scenario interaction is left. Reliability is the fraction of the
+# spread between genome fitnesses that is not noise (1: ranked exactly). Under
+# CRN, independent_episodes is how many independently seeded episodes it would
+# take to rank as well (missing when there is no noise left). Returns None when
+# there is too little to tell.
+def ranking_precision(episode_rewards, common=False):
+    rewards = np.array(episode_rewards, dtype=np.float64)
+    if rewards.ndim != 2 or rewards.shape[0] < 3 or rewards.shape[1] < 2:
+        return None
+    n_genomes, n_episodes = rewards.shape
+    within = float(np.mean(np.var(rewards, axis=1, ddof=1)))
+    spread = float(np.var(rewards.mean(axis=1), ddof=1))
+    precision = {"noise": within}
+    if common:
+        residual = (rewards - rewards.mean(axis=1, keepdims=True) - rewards.mean(axis=0) + rewards.mean())
+        precision["noise"] = float(np.sum(residual ** 2)) / ((n_genomes - 1) * (n_episodes - 1))
+        if precision["noise"] > 0:
+            precision["independent_episodes"] = n_episodes * within / precision["noise"]
+    if spread > 0:
+        precision["reliability"] = max(0.0, 1 - precision["noise"] / n_episodes / spread)
+    else:
+        precision["reliability"] = 0.0
+    return precision
 
-def eval_genome(genome, config,log_obs =False):
-    print("Evaluating a genome...") 
-    net = neat.nn.FeedForwardNetwork.create(genome, config)
-    env = SoccerEnv(render_mode=False)
-    total_reward = 0.0
-    MAX_STEPS = 300
 
+def eval_genome(genome, config, log_obs=False, env=None):
+    if env is None:
+        env = SoccerEnv(render_mode=False)
+    fitness, goal_rat = play_genome(genome, config, env, OBS_LOG_PATH if log_obs else None)
+    goal_ratio.append(goal_rat)
+    genome.fitness = fitness
+
+
+# Running totals of a genome's evaluation, plus where its env left off so more
+# episodes can be played later (possibly in another process) exactly as if the
+# evaluation had never stopped
+class EvalProgress:
+
+    def __init__(self, scenarios=None):
+        self.scenarios = scenarios  # (CRN mode, scenario_base()) or None
+        self.recorder = None  # ReplayRecorder the matches are recorded into, if any
+        self.episodes = 0
+        self.total_reward = 0.0
+        self.episode_rewards = []
+        self.scored = 0
+        self.conceded = 0
+        self.steps = 0  # env steps simulated
+        self.rng_state = None
+        self.stepcount = 0
+
+    def fitness(self):
+        # Avoid 0 fitness to prevent stagnation
+        return self.total_reward / self.episodes + 1e-6
+
+    def goal_ratio(self):
+        if self.conceded != 0:
+            return self.scored / self.conceded
+        return self.scored
+
+    def result(self):
+        return self.fitness(), self.goal_ratio()
+
+
+# Plays EPISODES matches on env and returns (fitness, goal ratio). With log_path set,
+# every step is streamed to that trajectory file; a recorder captures the match as a replay.
+def play_genome(genome, config, env, log_path=None, recorder=None):
+    return play_episodes(genome, config, env, EPISODES, log_path=log_path, recorder=recorder).result()
+
+
+# Plays n_episodes more matches, continuing progress (or starting the genome's
+# evaluation when it is None), and returns the updated progress
+def play_episodes(genome, config, env, n_episodes, progress=None, log_path=None, recorder=None):
+    logger.debug("Evaluating a genome...")
+    net = net_cache.get(genome, config)
+    if progress is None:
+        progress = EvalProgress()
+    if recorder is None:
+        recorder = progress.recorder
+    if progress.episodes == 0:
+        # A reused env must start exactly like a fresh one
+        start_match(env, genome_seed(genome))
+    else:
+        env.rng.setstate(progress.rng_state)
+        env.stepcount = progress.stepcount
 
-    obs_log = []
+    writer = TrajectoryWriter(log_path) if log_path else None
+    # Observations go into two reused buffers: the one the actions were chosen from
+    # is still needed for the trajectory log after the step
+    obs = np.empty(OBS_SIZE, dtype=np.float32)
+    next_obs = np.empty(OBS_SIZE, dtype=np.float32)
 
     scored_goal_count = 0
     conceded_goal_count = 0
-    for episode in range(EPISODES):
-        obs = env.reset()
+    for episode in range(progress.episodes, progress.episodes + n_episodes):
+        start_episode(env, episode, progress.scenarios)
+        env.write_obs(obs)
         done = False
         step = 0
+        episode_reward = 0.0
 
         while not done and step < MAX_STEPS:
-            if log_obs:
-                obs_log.append(obs)
-            
             inputs = obs
             output = net.activate(inputs)
             a1 = interpret_output(output)
@@ -134,42 +379,225 @@ def eval_genome(genome, config,log_obs =False):
                 #    print("Agent tried to kick!")
                  #   env.try_kick(env.p1, [1, 0])  # Right direction
 
-                obs, reward, done, scorer, _ = env.step(a1, a2)
+                # Both players keep their action for DECISION_INTERVAL physics steps
+                repeat = min(DECISION_INTERVAL, MAX_STEPS - step)
+                _, reward, done, scorer, info = env.step_repeat(a1, a2, repeat, next_obs)
+                if writer is not None:
+                    writer.append(episode, step, inputs, a1, a2, reward, scorer)
+                if recorder is not None:
+                    for _ in range(info["steps"]):
+                        recorder.record(a1, a2)
                 if scorer == 1:
                     scored_goal_count+=1
                 if scorer == 2:
                     conceded_goal_count+=1
-                total_reward += reward
+                progress.total_reward += reward
+                episode_reward += reward
+                step += info["steps"]
+                obs, next_obs = next_obs, obs
             except Exception as e:
-                print(f"Error during step: {e}")
+                logger.error(f"Error during step: {e}")
                 break
 
-            step += 1
-
+        if recorder is not None:
+            recorder.end_episode()
         if step >= MAX_STEPS:
-            print(f"Episode {episode+1} ended due to timeout.")
-            total_reward -= 0.2  # Penalty for not scoring
+            logger.debug(f"Episode {episode+1} ended due to timeout.")
+            progress.total_reward -= 0.2  # Penalty for not scoring
+            episode_reward -= 0.2
         else:
-            print(f"Episode {episode+1} ended with goal.")
-
-    if conceded_goal_count != 0:
-        goal_rat = scored_goal_count/conceded_goal_count
+            logger.debug(f"Episode {episode+1} ended with goal.")
+        progress.episode_rewards.append(episode_reward)
+        progress.steps += step
+
+    if writer is not None:
+        writer.close()
+
+    progress.episodes += n_episodes
+    progress.scored += scored_goal_count
+    progress.conceded += conceded_goal_count
+    progress.rng_state = env.rng.getstate()
+    progress.stepcount = env.stepcount
+    if profiler.enabled:
+        profiler.count("goals_scored", scored_goal_count)
+        profiler.count("goals_conceded", conceded_goal_count)
+        profiler.count("episodes", n_episodes)
+    return progress
+
+
+# Successive halving over episodes. Every genome plays the first RACING_SCHEDULE
+# round, then only genomes that could still be among their species' survivors
+# (the reproduction config's survival_threshold and elitism, as in
+# DefaultReproduction) play on, up to the full EPISODES. Dropped genomes keep the
+# mean of the episodes they played. known holds (genome, fitness) of genomes that
+# are not being evaluated (cache hits) but compete for the same places.
+# Returns one EvalProgress per job.
+def race_genomes(jobs, config, known=(), record=False):
+    progress = [_new_progress(genome, record) for genome, _ in jobs]
+    racing = list(range(len(jobs)))
+    rounds = [n for n in RACING_SCHEDULE if n < EPISODES] + [EPISODES]
+    for target in rounds:
+        tasks = []
+        indices = []
+        for i in racing:
+            genome, log_path = jobs[i]
+            played = progress[i].episodes if progress[i] is not None else 0
+            # The logged trajectory always covers a full evaluation
+            n = (EPISODES if log_path else target) - played
+            if n > 0:
+                tasks.append((genome, n, progress[i], log_path))
+                indices.append(i)
+        for i, p in zip(indices, _run_episodes(tasks, config)):
+            progress[i] = p
+        if target < EPISODES:
+            racing = _still_racing(jobs, progress, racing, known, config)
+    return progress
+
+
+# Indices in racing whose fitness could still reach their species' survival cutoff
+# within RACING_CONFIDENCE standard errors
+def _still_racing(jobs, progress, racing, known, config):
+    # Spread of single episode rewards: within genomes once they have played a few,
+    # otherwise across genomes, which overestimates it and keeps more of them racing
+    variances = [np.var(p.episode_rewards, ddof=1) for p in progress if len(p.episode_rewards) > 1]
+    if variances:
+        sigma = math.sqrt(np.mean(variances))
     else:
-        goal_rat = scored_goal_count
-    goal_ratio.append(goal_rat)
-    # Avoid 0 fitness to prevent stagnation
-    genome.fitness = total_reward / EPISODES + 1e-6
-
-    if log_obs:
-        with open('obs_log_gen1.csv', 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow("p1_x,p1_y,p2_x,p2_y,ball_x,ball_y,ball_vel_0,ball_vel_1,possession")  # Header
-            writer.writerows(obs_log)
-        print("Logged observations to obs_log_gen1.csv")
-
-
-
-def run_neat(config_file):
+        sigma = float(np.std([r for p in progress for r in p.episode_rewards]))
+
+    by_species = {}
+    for (genome, _), p in zip(jobs, progress):
+        by_species.setdefault(_species_of(genome), []).append(p.fitness())
+    for genome, fitness in known:
+        by_species.setdefault(_species_of(genome), []).append(fitness)
+
+    repro = config.reproduction_config
+    cutoffs = {}
+    for sid, fitnesses in by_species.items():
+        survivors = max(int(math.ceil(repro.survival_threshold * len(fitnesses))), 2, repro.elitism)
+        fitnesses.sort(reverse=True)
+        cutoffs[sid] = fitnesses[survivors - 1] if len(fitnesses) > survivors else float('-inf')
+
+    still = []
+    for i in racing:
+        genome, _ = jobs[i]
+        p = progress[i]
+        if p.fitness() + RACING_CONFIDENCE * sigma / math.sqrt(p.episodes) >= cutoffs[_species_of(genome)]:
+            still.append(i)
+    return still
+
+
+# Species of a genome in the population being evaluated (one species outside run_neat)
+def _species_of(genome):
+    if _species_set is None:
+        return None
+    return _species_set.genome_to_species.get(genome.key)
+
+
+# Runs (genome, n_episodes, progress, log_path) tasks on the remote workers, the
+# pool or serially and returns their updated progress
+def _run_episodes(tasks, config):
+    if _coordinator is not None:
+        # The trajectory log is written where training runs
+        env = _get_serial_env()
+        local = {i: play_episodes(genome, config, env, n, progress, log_path)
+                 for i, (genome, n, progress, log_path) in enumerate(tasks) if log_path}
+        remote = iter(_coordinator.run([task for task in tasks if not task[3]]))
+        return [local[i] if i in local else next(remote) for i in range(len(tasks))]
+    if _pool is not None:
+        fresh = []
+        for progress, stats in _pool.map(_eval_in_worker, tasks):
+            fresh.append(progress)
+            if stats is not None:
+                profiler.merge(stats)
+        return fresh
+    env = _get_serial_env()
+    return [play_episodes(genome, config, env, n, progress, log_path) for genome, n, progress, log_path in tasks]
+
+
+# Species set of the running population, used by the racing cutoffs
+_species_set = None
+# Append-only logs of the running training, one row per generation / per genome
+_fitness_log = None
+_goal_log = None
+_metrics = None  # MetricsPublisher of the running training
+_timestamp = None  # names this run's log files
+
+# Headless env reused for every genome in serial mode
+_serial_env = None
+
+def _get_serial_env():
+    global _serial_env
+    if _serial_env is None:
+        _serial_env = SoccerEnv(render_mode=False)
+    return _serial_env
+
+
+# Process pool used by eval_genomes when training with more than one worker
+_pool = None
+# distributed.Coordinator used instead when remote workers evaluate the genomes
+_coordinator = None
+_worker_env = None
+_worker_config = None
+
+# Runs once per worker process: the env lives as long as the worker
+def _init_worker(config, profile=False, decision_interval=1, seed=SEED):
+    global _worker_env, _worker_config, DECISION_INTERVAL, SEED
+    _worker_env = SoccerEnv(render_mode=False)
+    _worker_config = config
+    DECISION_INTERVAL = decision_interval
+    SEED = seed
+    if profile:
+        profiler.enable()
+
+
+# Returns the evaluation and, when profiling, the stats gathered for it
+def _eval_in_worker(task):
+    genome, n_episodes, progress, log_path = task
+    progress = play_episodes(genome, _worker_config, _worker_env, n_episodes, progress, log_path)
+    return progress, profiler.take() if profiler.enabled else None
+
+
+# Phases timed when profiling is enabled
+profiler.instrument(ScalarNet, "activate", "net_activation")
+profiler.instrument(sys.modules[__name__], "get_agent2_action", "opponent")
+profiler.instrument(selfplay, "play_selfplay", "selfplay")
+
+
+
+# What a checkpoint stores besides the population: this module's statistics,
+# the evaluation settings and where the logs stood
+def _training_state():
+    return {
+        "generation_counter": generation_counter[0],
+        "max_fitnesses": list(max_fitnesses),
+        "goal_ratio": list(goal_ratio),
+        "fitness_cache": fitness_cache,
+        "decision_interval": DECISION_INTERVAL,
+        "seed": SEED,
+        "racing": RACING,
+        "crn": CRN,
+        "hall_of_fame": hall_of_fame,
+        "timestamp": _timestamp,
+        "fitness_log": (_fitness_log.path, _fitness_log.offset()),
+        "goal_log": (_goal_log.path, _goal_log.offset()),
+        "metrics_log": (_metrics.path, _metrics.offset()),
+    }
+
+
+def run_neat(config_file, num_workers=NUM_WORKERS, seed=SEED, profile=False, decision_interval=DECISION_INTERVAL,
+             racing=RACING, listen=None, authkey=None, generations=GENERATIONS, resume=None,
+             checkpoint_path=CHECKPOINT_PATH, checkpoint_interval=CHECKPOINT_INTERVAL, selfplay_enabled=SELFPLAY,
+             metrics_port=None, crn=CRN):
+    global _pool, _coordinator, _species_set, _fitness_log, _goal_log, _metrics, _timestamp, fitness_cache
+    global hall_of_fame
+    global DECISION_INTERVAL, RACING, CRN, SEED
+    DECISION_INTERVAL = decision_interval
+    SEED = seed
+    RACING = racing
+    CRN = crn
+    if profile:
+        profiler.enable()
     config = neat.Config(
         neat.DefaultGenome,
         neat.DefaultReproduction,
@@ -178,13 +606,72 @@ def run_neat(config_file):
         config_file
     )
 
-    p = neat.Population(config)
+    if resume:
+        # Carries on with the checkpointed settings so the run continues exactly
+        state = load_checkpoint(resume)
+        p = restore_population(state, config)
+        generation_counter[0] = state["generation_counter"]
+        max_fitnesses[:] = state["max_fitnesses"]
+        goal_ratio[:] = state["goal_ratio"]
+        fitness_cache = state["fitness_cache"]
+        DECISION_INTERVAL = state["decision_interval"]
+        SEED = state.get("seed", SEED)
+        RACING = state["racing"]
+        CRN = state.get("crn")
+        hall_of_fame = state["hall_of_fame"]
+        if hall_of_fame is not None:
+            hall_of_fame.config = config
+        _timestamp = state["timestamp"]
+        fitness_log_path, fitness_offset = state["fitness_log"]
+        goal_log_path, goal_offset = state["goal_log"]
+        metrics_path, metrics_offset = state["metrics_log"]
+        print(f"✔ Resumed from {resume} after generation {generation_counter[0]}")
+        if generations <= generation_counter[0]:
+            # p.run(..., 0) would return no winner and winner.pkl would be overwritten with None
+            print(f"No generations left to run ({generation_counter[0]} done, --generations {generations}); "
+                  f"winner.pkl is left as it is")
+            return
+    else:
+        # NEAT itself mutates with the global random module
+        random.seed(seed)
+        p = neat.Population(config)
+        _timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        fitness_log_path, fitness_offset = f"fitness_log_{_timestamp}.csv", 0
+        goal_log_path, goal_offset = "goal_ratio_log.csv", 0
+        metrics_path, metrics_offset = f"metrics_{_timestamp}.jsonl", 0
+        hall_of_fame = selfplay.HallOfFame(config) if selfplay_enabled else None
+    _species_set = p.species
+    _fitness_log = AppendLog(fitness_log_path, ["Generation", "MaxFitness"], fitness_offset)
+    _goal_log = AppendLog(goal_log_path, offset=goal_offset)
+    _metrics = MetricsPublisher(metrics_path, metrics_port, offset=metrics_offset)
+    if metrics_port is not None:
+        print(f"✔ Metrics served on http://127.0.0.1:{metrics_port} (python metrics.py view)")
 
     p.add_reporter(neat.StdOutReporter(True))
     stats = neat.StatisticsReporter()
     p.add_reporter(stats)
-
-    winner = p.run(eval_genomes, 50)
+    p.add_reporter(Checkpointer(p, checkpoint_path, checkpoint_interval, _training_state))
+
+    if listen:
+        from distributed import Coordinator, parse_address, AUTHKEY
+        _coordinator = Coordinator(parse_address(listen), config, authkey or AUTHKEY)
+    elif num_workers > 1:
+        _pool = multiprocessing.Pool(num_workers, initializer=_init_worker, initargs=(config, profile, DECISION_INTERVAL, SEED))
+    try:
+        winner = p.run(eval_genomes, generations - generation_counter[0])
+    finally:
+        if _pool is not None:
+            _pool.close()
+            _pool.join()
+            _pool = None
+        if _coordinator is not None:
+            _coordinator.close()
+            _coordinator = None
+        _species_set = None
+        _fitness_log.close()
+        _goal_log.close()
+        _metrics.close()
+        _fitness_log = _goal_log = _metrics = None
 
     print("\nBest genome:\n{}".format(winner))
 
@@ -198,37 +685,49 @@ def run_neat(config_file):
     # visualize.plot_stats(stats, ylog=False, view=True)
     # visualize.plot_species(stats, view=True)
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    csv_filename = f"fitness_log_{timestamp}.csv"
-    png_filename = f"fitness_plot_{timestamp}.png"
-    with open(csv_filename, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(["Generation", "MaxFitness"])
-        for i, fitness in enumerate(max_fitnesses):
-            writer.writerow([i + 1, fitness])
-    print(f"✔ Fitness data saved to {csv_filename}")
-
-    with open('goal_ratio_log.csv', 'w', newline='') as f:
-        writer = csv.writer(f)
-        for i, ratio in enumerate(goal_ratio):
-            writer.writerow([i + 1, goal_ratio])
-    print("Logged ratio")
-
-
-    plt.figure(figsize=(10, 5))
-    print(max_fitnesses)
-    plt.plot(max_fitnesses, label='Max Fitness per Generation')
-    plt.axhline(y=config.fitness_threshold, color='r', linestyle='--', label='Fitness Threshold')
-    plt.xlabel("Generation")
-    plt.ylabel("Fitness")
-    plt.title("Fitness Progression Over Generations")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(png_filename)
-    plt.show()
+    print(f"✔ Fitness data saved to {fitness_log_path}")
+    print(f"✔ Goal ratios saved to {goal_log_path}")
+    print(f"✔ Metrics saved to {metrics_path} (plot with: python metrics.py plot {metrics_path} "
+          f"--threshold {config.fitness_threshold})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train NEAT agents against the scripted opponent")
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS, help="evaluation processes (1 = serial)")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--profile", action="store_true", help="log per-phase timings every generation")
+    parser.add_argument("--decision-interval", type=int, default=DECISION_INTERVAL,
+                        help="physics steps each network/opponent decision is repeated for")
+    parser.add_argument("--racing", action="store_true",
+                        help="give genomes more episodes only while they can still survive selection")
+    parser.add_argument("--crn", choices=CRN_MODES,
+                        help="evaluate every genome of a generation on the same scenarios "
+                             "(antithetic/stratified also balance the kickoff direction)")
+    parser.add_argument("--selfplay", action="store_true", help="also evaluate against a hall of fame of past champions")
+    parser.add_argument("--metrics-port", type=int, help="serve live metrics on this localhost port")
+    parser.add_argument("--listen", metavar="HOST:PORT",
+                        help="evaluate on remote workers (python distributed.py HOST:PORT) instead of locally")
+    parser.add_argument("--authkey", help="shared key remote workers must present")
+    parser.add_argument("--generations", type=int, default=GENERATIONS, help="total generations of the run")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH, help="where to write checkpoints")
+    parser.add_argument("--checkpoint-interval", type=int, default=CHECKPOINT_INTERVAL,
+                        help="generations between checkpoints")
+    parser.add_argument("--resume", metavar="CHECKPOINT", help="continue the run saved in a checkpoint")
+    parser.add_argument("--verbose", action="store_true", help="log every episode and goal")
+    args = parser.parse_args(argv)
+    if args.decision_interval < 1:
+        parser.error("--decision-interval must be at least 1")
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s")
 
-if __name__ == '__main__':
     local_dir = os.path.dirname(__file__)
     config_path = os.path.join(local_dir, 'config-feedforward.txt')
-    run_neat(config_path)
+    run_neat(config_path, num_workers=args.workers, seed=args.seed, profile=args.profile,
+             decision_interval=args.decision_interval, racing=args.racing, listen=args.listen,
+             authkey=args.authkey.encode() if args.authkey else None, generations=args.generations,
+             resume=args.resume, checkpoint_path=args.checkpoint, checkpoint_interval=args.checkpoint_interval,
+             selfplay_enabled=args.selfplay, metrics_port=args.metrics_port, crn=args.crn)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+# trajectory.py
+# Append-only trajectory log. Steps are buffered in a fixed-size chunk and
+# appended to a .npy file whenever the chunk fills up, so memory stays bounded
+# however long the run is. The header is rewritten with the current length on
+# every flush, so the file is a valid .npy at any point and can be memory-mapped
+# with load_trajectory (or plain np.load(path, mmap_mode="r")) while it grows.
+import numpy as np
+
+OBS_SIZE = 9
+STEP_DTYPE = np.dtype([
+    ("episode", "<u4"),
+    ("step", "<u4"),
+    ("obs", "<f4", (OBS_SIZE,)),  # observation the actions were chosen from
+    ("action1", "u1"),
+    ("action2", "u1"),
+    ("reward", "<f8"),
+    ("scorer", "u1"),  # 0 = no goal, 1 = player 1, 2 = player 2
+])
+CHUNK_SIZE = 4096
+HEADER_SIZE = 256  # fixed so the header can be rewritten in place
+
+
+def _npy_header(dtype, length):
+    header = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (np.lib.format.dtype_to_descr(dtype), length)
+    # magic (6) + version (2) + header length (2) + header padded with spaces and ending in a newline
+    padding = HEADER_SIZE - 10 - len(header) - 1
+    if padding < 0:
+        raise ValueError("Trajectory dtype too large for the .npy header")
+    header = header + " " * padding + "\n"
+    return b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header.encode("latin1")
+
+
+class TrajectoryWriter:
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.file = open(path, "wb")
+        self.buffer = np.zeros(chunk_size, dtype=STEP_DTYPE)
+        self.pending = 0
+        self.length = 0
+        self.file.write(_npy_header(STEP_DTYPE, 0))
+
+    def append(self, episode, step, obs, action1, action2, reward, scorer):
+        row = self.buffer[self.pending]
+        row["episode"] = episode
+        row["step"] = step
+        row["obs"] = obs
+        row["action1"] = action1
+        row["action2"] = action2
+        row["reward"] = reward
+        row["scorer"] = scorer
+        self.pending += 1
+        if self.pending == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.file.seek(0, 2)
+            self.file.write(self.buffer[:self.pending].tobytes())
+            self.length += self.pending
+            self.pending = 0
+        self.file.seek(0)
+        self.file.write(_npy_header(STEP_DTYPE, self.length))
+        self.file.flush()
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Memory-maps a trajectory file; nothing is read until the fields are accessed
+def load_trajectory(path):
+    return np.load(path, mmap_mode="r")
+
+
+# (start, end) row ranges of each episode, in file order
+def episode_bounds(trajectory):
+    episodes = np.asarray(trajectory["episode"])
+    starts = np.flatnonzero(np.r_[True, episodes[1:] != episodes[:-1]])
+    ends = np.r_[starts[1:], len(episodes)]
+    return list(zip(starts.tolist(), ends.tolist()))
@@ -0,0 +1,244 @@
+# vec_env.py
+# Batched version of SoccerEnv: every match lives in one slot of a set of
+# struct-of-arrays NumPy buffers, so n_envs matches advance with one call.
+# The physics follow SoccerEnv.step line by line (same pygame.Rect rules for
+# collisions and centering) and each env draws from its own random.Random in
+# the same order the scalar env draws from its rng, so an env seeded like the
+# scalar one plays out identically.
+import random
+import numpy as np
+
+from env import WIDTH, HEIGHT, PLAYER_SIZE, BALL_SIZE, PLAYER_SPEED, BALL_SPEED, GOAL_WIDTH
+
+GK1_X = 10
+GK2_X = WIDTH - 30
+GOAL_TOP = HEIGHT // 2 - GOAL_WIDTH // 2
+GOAL_BOTTOM = HEIGHT // 2 + GOAL_WIDTH // 2
+LOSS_PROBABILITY = 0.01
+REACTION_CHANCE = 0.5
+OFFSET_RANGE = 50
+OBS_SIZE = 9
+
+# Player displacement per action: 0=up, 1=down, 2=left, 3=right, 4=kick
+MOVE_DX = np.array([0, 0, -PLAYER_SPEED, PLAYER_SPEED, 0], dtype=np.int64)
+MOVE_DY = np.array([-PLAYER_SPEED, PLAYER_SPEED, 0, 0, 0], dtype=np.int64)
+
+
+# pygame.Rect.colliderect for same-sized boxes, elementwise
+def _collide(ax, ay, aw, ah, bx, by, bw, bh):
+    return (ax < bx + bw) & (ay < by + bh) & (ax + aw > bx) & (ay + ah > by)
+
+
+class VecSoccerEnv:
+
+    def __init__(self, n_envs, seed=None, max_steps=None):
+        self.n_envs = n_envs
+        self.max_steps = max_steps
+        # env i is seeded with seed + i so it matches SoccerEnv(seed=seed + i)
+        self.rngs = [random.Random(None if seed is None else seed + i) for i in range(n_envs)]
+
+        shape = (n_envs,)
+        self.p1_x = np.zeros(shape, dtype=np.int64)
+        self.p1_y = np.zeros(shape, dtype=np.int64)
+        self.p2_x = np.zeros(shape, dtype=np.int64)
+        self.p2_y = np.zeros(shape, dtype=np.int64)
+        self.gk1_y = np.zeros(shape, dtype=np.int64)
+        self.gk2_y = np.zeros(shape, dtype=np.int64)
+        self.ball_x = np.zeros(shape, dtype=np.int64)
+        self.ball_y = np.zeros(shape, dtype=np.int64)
+        self.ball_vx = np.zeros(shape, dtype=np.int64)
+        self.ball_vy = np.zeros(shape, dtype=np.int64)
+        self.possession = np.zeros(shape, dtype=np.int64)  # 0 = none, 1 = p1, 2 = p2
+        self.done = np.zeros(shape, dtype=bool)
+        # Like SoccerEnv.stepcount this is never cleared by reset, it drives the goalkeeper cadence
+        self.stepcount = np.zeros(shape, dtype=np.int64)
+        self.episode_steps = np.zeros(shape, dtype=np.int64)
+
+        self.obs = np.zeros((n_envs, OBS_SIZE), dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        self._reset_envs(np.ones(self.n_envs, dtype=bool))
+        return self.get_obs()
+
+    def _reset_envs(self, mask):
+        idx = np.flatnonzero(mask)
+        if idx.size == 0:
+            return
+        self.p1_x[idx] = 100
+        self.p1_y[idx] = HEIGHT // 2
+        self.p2_x[idx] = WIDTH - 100
+        self.p2_y[idx] = HEIGHT // 2
+        self.ball_x[idx] = WIDTH // 2
+        self.ball_y[idx] = HEIGHT // 2
+        self.ball_vx[idx] = [self.rngs[i].randint(-1, 1) for i in idx]
+        self.ball_vy[idx] = 0
+        self.gk1_y[idx] = HEIGHT // 2
+        self.gk2_y[idx] = HEIGHT // 2
+        self.possession[idx] = 0
+        self.done[idx] = False
+        self.episode_steps[idx] = 0
+
+    def get_obs(self, out=None):
+        obs = self.obs if out is None else out
+        obs[:, 0] = self.p1_x / WIDTH
+        obs[:, 1] = self.p1_y / HEIGHT
+        obs[:, 2] = self.p2_x / WIDTH
+        obs[:, 3] = self.p2_y / HEIGHT
+        obs[:, 4] = self.ball_x / WIDTH
+        obs[:, 5] = self.ball_y / HEIGHT
+        obs[:, 6] = self.ball_vx / BALL_SPEED
+        obs[:, 7] = self.ball_vy / BALL_SPEED
+        obs[:, 8] = self.possession / 2
+        return obs.copy() if out is None else obs
+
+    # Returns (obs, reward, done, scorer, info). Envs that finish are reset right away,
+    # so obs holds their first observation of the next episode and the last one is
+    # kept in info["terminal_obs"].
+    def step(self, action1, action2):
+        n = self.n_envs
+        a1 = np.broadcast_to(np.asarray(action1, dtype=np.int64), (n,))
+        a2 = np.broadcast_to(np.asarray(action2, dtype=np.int64), (n,))
+
+        old_dist = self._ball_dist2()
+        self._move_players(a1, a2)
+        self._handle_possession(a1, a2)
+
+        reward = np.zeros(n, dtype=np.float64)
+
+        # Reward for gaining possession
+        reward += np.where(self.possession == 1, 0.01, 0.0)
+
+        # Reward for moving closer to the ball
+        reward += np.where(self._ball_dist2() < old_dist, 0.02, 0.0)
+
+        # Penalty for kicking without possession
+        reward -= np.where((a1 == 4) & (self.possession != 1), 0.5, 0.0)
+
+        kick1 = (a1 == 4) & (self.possession == 1)
+        self.ball_vx[kick1] = BALL_SPEED
+        self.ball_vy[kick1] = 0
+        self.possession[kick1] = 0
+        reward += np.where(kick1, np.where(self.ball_x > WIDTH * 0.7, 0.23, 0.05), 0.0)
+
+        kick2 = (a2 == 4) & (self.possession == 2)
+        self.ball_vx[kick2] = -BALL_SPEED
+        self.ball_vy[kick2] = 0
+        self.possession[kick2] = 0
+
+        self._move_ball(np.ones(n, dtype=bool))
+
+        in_goal = (GOAL_TOP <= self.ball_y) & (self.ball_y <= GOAL_BOTTOM)
+        own_goal = (self.ball_x <= 0) & in_goal
+        goal = ~own_goal & (self.ball_x + BALL_SIZE >= WIDTH) & in_goal
+        reward -= np.where(own_goal, 0.5, 0.0)
+        reward += np.where(goal, 2.0, 0.0)
+        reward += np.where(goal & (a1 == 4), 0.5, 0.0)
+        scorer = np.where(own_goal, 2, np.where(goal, 1, 0))
+        self.done |= own_goal | goal
+
+        self._move_goalkeepers(self.stepcount % 5 == 0)
+        self.stepcount += 1
+        self.episode_steps += 1
+        if self.max_steps is not None:
+            self.done |= self.episode_steps >= self.max_steps
+
+        done = self.done.copy()
+        terminal_obs = self.get_obs()
+        self._reset_envs(done)
+        obs = self.get_obs() if done.any() else terminal_obs
+        return obs, reward, done, scorer, {"terminal_obs": terminal_obs}
+
+    def _ball_dist2(self):
+        # Squared center distance; orders the same as SoccerEnv._distance since sqrt is monotonic
+        dx = (self.p1_x + PLAYER_SIZE // 2) - (self.ball_x + BALL_SIZE // 2)
+        dy = (self.p1_y + PLAYER_SIZE // 2) - (self.ball_y + BALL_SIZE // 2)
+        return dx * dx + dy * dy
+
+    def _move_players(self, a1, a2):
+        np.clip(self.p1_x + MOVE_DX[a1], 0, WIDTH - PLAYER_SIZE, out=self.p1_x)
+        np.clip(self.p1_y + MOVE_DY[a1], 0, HEIGHT - PLAYER_SIZE, out=self.p1_y)
+        np.clip(self.p2_x + MOVE_DX[a2], 0, WIDTH - PLAYER_SIZE, out=self.p2_x)
+        np.clip(self.p2_y + MOVE_DY[a2], 0, HEIGHT - PLAYER_SIZE, out=self.p2_y)
+
+    def _handle_possession(self, a1, a2):
+        bx, by = self.ball_x, self.ball_y
+        vx = self.ball_vx
+
+        # Goalkeepers bounce the ball back into play
+        hit_gk1 = _collide(bx, by, BALL_SIZE, BALL_SIZE, GK1_X, self.gk1_y, PLAYER_SIZE, PLAYER_SIZE)
+        vx[hit_gk1] = np.abs(vx[hit_gk1])
+        hit_gk2 = _collide(bx, by, BALL_SIZE, BALL_SIZE, GK2_X, self.gk2_y, PLAYER_SIZE, PLAYER_SIZE)
+        vx[hit_gk2] = -np.abs(vx[hit_gk2])
+
+        p1_close = _collide(bx, by, BALL_SIZE, BALL_SIZE, self.p1_x, self.p1_y, PLAYER_SIZE, PLAYER_SIZE)
+        p2_close = _collide(bx, by, BALL_SIZE, BALL_SIZE, self.p2_x, self.p2_y, PLAYER_SIZE, PLAYER_SIZE)
+        held1 = self.possession == 1
+        held2 = self.possession == 2
+        held = held1 | held2
+
+        # The holder loses the ball if out of contact, otherwise with LOSS_PROBABILITY;
+        # the random draw only happens while still in contact, as in the scalar env
+        lost = (held1 & ~p1_close) | (held2 & ~p2_close)
+        for i in np.flatnonzero(held & ~lost):
+            if self.rngs[i].random() < LOSS_PROBABILITY:
+                lost[i] = True
+        self.possession[lost] = 0
+
+        # The holder dribbles: the ball takes the move direction and advances an extra tick
+        owner_action = np.where(held1, a1, a2)
+        dribble = held & ~lost & (owner_action != 4)
+        vertical = dribble & (owner_action < 2)
+        horizontal = dribble & ~vertical
+        self.ball_vy[vertical] = MOVE_DY[owner_action[vertical]]
+        self.ball_vx[horizontal] = MOVE_DX[owner_action[horizontal]]
+        self._move_ball(dribble)
+
+        # Loose ball: whoever touches it takes it, a coin flip if both do
+        free = ~held
+        both = free & p1_close & p2_close
+        for i in np.flatnonzero(both):
+            self.possession[i] = self.rngs[i].choice([1, 2])
+        self.possession[free & p1_close & ~p2_close] = 1
+        self.possession[free & p2_close & ~p1_close] = 2
+
+        gained = free & (p1_close | p2_close)
+        gained1 = gained & (self.possession == 1)
+        gained2 = gained & (self.possession == 2)
+        offset = PLAYER_SIZE // 2 - BALL_SIZE // 2
+        self.ball_x[gained1] = self.p1_x[gained1] + offset
+        self.ball_y[gained1] = self.p1_y[gained1] + offset
+        self.ball_x[gained2] = self.p2_x[gained2] + offset
+        self.ball_y[gained2] = self.p2_y[gained2] + offset
+
+    def _move_goalkeepers(self, mask):
+        idx = np.flatnonzero(mask)
+        if idx.size == 0:
+            return
+        ball_cy = (self.ball_y[idx] + BALL_SIZE // 2).tolist()
+        gk1_y = self.gk1_y[idx].tolist()
+        gk2_y = self.gk2_y[idx].tolist()
+        for j, i in enumerate(idx):
+            rng = self.rngs[i]
+            if rng.random() < REACTION_CHANCE:
+                target_y1 = ball_cy[j] + rng.randint(-OFFSET_RANGE, OFFSET_RANGE)
+                if target_y1 < gk1_y[j] + PLAYER_SIZE // 2:
+                    gk1_y[j] -= PLAYER_SPEED
+                elif target_y1 > gk1_y[j] + PLAYER_SIZE // 2:
+                    gk1_y[j] += PLAYER_SPEED
+            if rng.random() < REACTION_CHANCE:
+                target_y2 = ball_cy[j] + rng.randint(-OFFSET_RANGE, OFFSET_RANGE)
+                if target_y2 < gk2_y[j] + PLAYER_SIZE // 2:
+                    gk2_y[j] -= PLAYER_SPEED
+                elif target_y2 > gk2_y[j] + PLAYER_SIZE // 2:
+                    gk2_y[j] += PLAYER_SPEED
+
+        # Clamp positions within the goal area
+        self.gk1_y[idx] = np.clip(gk1_y, GOAL_TOP, GOAL_BOTTOM - PLAYER_SIZE)
+        self.gk2_y[idx] = np.clip(gk2_y, GOAL_TOP, GOAL_BOTTOM - PLAYER_SIZE)
+
+    def _move_ball(self, mask):
+        self.ball_x[mask] += self.ball_vx[mask]
+        self.ball_y[mask] += self.ball_vy[mask]
+        bounce = mask & ((self.ball_y <= 0) | (self.ball_y + BALL_SIZE >= HEIGHT))
+        self.ball_vy[bounce] *= -1